@@ -0,0 +1,31 @@
+# The game of 10 and its dp strategy
+#  The modules follow the sections of the engine:
+#   cards       the cards, the hands (bitboards) and the rounds
+#   strategies  the strategies (random, highest and dp) and the beliefs
+#   search      the dp algorithm, its heuristics and its aggregators
+#   endgame     the exact endgame solver and the sampling search
+#   parallel    the searches on a pool of processes
+#   engine      the game engine, its rules and the deals
+#   batch       the batch simulation (numpy)
+#   tournament  the tournaments and their results
+#   benchmarks  the benchmarks
+#   server      the bot server for the arbiter
+#   book        the opening book of the first round
+#   cli         the commands of python -m pix
+#  Importing pix only imports the game and the strategies: numpy, the process pools and the
+#  tournament are imported by the code that uses them.
+from .cards import (
+    all_hand, attribute_cards, card_index, card_points, clubs, create_deck, diamonds, hand_to_list,
+    hearts, make_hand, one_hot, playable_cards, print_score, score, spades, suit_of, suits,
+    trick_result
+)
+from .strategies import belief_state, dp_strategy, highest_strategy, random_strategy
+from .search import (
+    aggregators, best_card_win_heuristique, dp_algorithm, gen_cutoff_agregator, gen_future_heuristic,
+    hand_heuristic, heuristics, min_utility, search_stats, transposition_table
+)
+from .endgame import endgame_solver, sampling_search
+from .engine import (
+    bet_rule, deal_corpus, first_led_rule, fixed_atout_rule, game, game_engine, make_deal,
+    no_atout_rule, play_rng, rules, save_deal_corpus
+)
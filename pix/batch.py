@@ -0,0 +1,123 @@
+from .cards import card_points
+
+try:
+    import numpy as np
+except ImportError: # numpy is only needed by the batch simulation
+    np = None
+
+# ==== BATCH SIMULATION (NUMPY) ====
+# Plays many games at the same time. The N games are numpy arrays (hands are N x 4 x 40 booleans,
+#  the table is N x 4 cards) and all the games advance of one card at each step. Only the
+#  strategies that do not search (random and highest) can be played this way.
+#  Suits are numbers here (0 to 3, -1 if not chosen yet), in the one hot order.
+
+# Cards of each suit (4 x 40) and points of each card
+if np is not None:
+    np_card_suit = np.arange(40) // 10
+    np_suit_masks = np.arange(4)[:, None] == np_card_suit[None, :]
+    np_points = np.array(card_points)
+
+# Decks (lists of 4 hands) as an N x 4 x 40 boolean array, for the batch heuristics
+def np_decks(decks):
+    hands = np.array(decks, dtype=np.uint64).reshape(-1, 4)
+    return (hands[:, :, None] >> np.arange(40, dtype=np.uint64) & 1).astype(bool)
+
+# Vectorized playable_cards: hands is N x 40, asked is N
+def batch_playable_cards(hands, asked):
+    colored_hand = hands & np_suit_masks[asked] & (asked >= 0)[:, None]
+    return np.where(colored_hand.any(axis=1)[:, None], colored_hand, hands)
+
+# Vectorized trick_result: table is N x 4 cards, asked and atout are N suits
+#  Returns the winner and the points of each trick
+def batch_trick_result(table, asked, atout):
+    suits = np_card_suit[table]
+    # Like trick_result, the atouts are ranked 40 below their index
+    rank = np.where(suits == atout[:, None], table - 40, np.where(suits == asked[:, None], table, 40))
+    winner = rank.argmin(axis=1)
+    return winner, np_points[table].sum(axis=1)
+
+# Vectorized score: boards is N x 40
+def batch_score(boards):
+    return boards.astype(np.int64) @ np_points
+
+# First card (from the left) of each hand, -1 if the hand is empty
+def batch_first(hands):
+    return np.where(hands.any(axis=1), hands.argmax(axis=1), -1)
+
+# Vectorized get_highest_any_suite
+def batch_highest_any_suite(hands):
+    by_suit = hands.reshape(-1, 4, 10)
+    rank = np.where(by_suit.any(axis=2), by_suit.argmax(axis=2), 10)
+    suit = rank.argmin(axis=1)
+    return suit * 10 + rank[np.arange(len(hands)), suit]
+
+# Random strategy: a random playable card
+#  The k-th playable card, k drawn uniformly for each game
+def batch_random_card(hands, playable, asked, atout, rng):
+    k = (rng.random(len(playable)) * playable.sum(axis=1)).astype(np.int64)
+    return (playable.cumsum(axis=1, dtype=np.int8) > k[:, None]).argmax(axis=1)
+
+# Highest strategy: same rules as highest_strategy
+def batch_highest_card(hands, playable, asked, atout, rng):
+    # Following: the first card of the asked suit or of the atout, if any, else a random card
+    masked = playable & (np_suit_masks[asked] | np_suit_masks[atout]) & (asked >= 0)[:, None]
+    card = batch_first(masked)
+    no_card = card < 0
+    if no_card.any():
+        card[no_card] = batch_random_card(hands[no_card], playable[no_card], asked[no_card], atout[no_card], rng)
+
+    # Leading: the first atout, if any, else the highest card of any suit
+    atout_masked = playable & np_suit_masks[atout] & (atout >= 0)[:, None]
+    leading = np.where(atout_masked.any(axis=1), batch_first(atout_masked), batch_highest_any_suite(playable))
+    return np.where(asked < 0, leading, card)
+
+batch_strategies = {
+    "random": batch_random_card,
+    "highest": batch_highest_card,
+}
+
+# Play n_games games at the same time and return the scores (n_games x 4, like game())
+def batch_game(n_games, strategies=("random", "random", "random", "random"), seed=None):
+    if np is None:
+        raise ImportError("batch_game needs numpy")
+
+    rng = np.random.default_rng(seed)
+    games = np.arange(n_games)
+
+    # Create the decks and attribute the cards to the players (card i of the deck goes to player i%4)
+    decks = rng.random((n_games, 40)).argsort(axis=1)
+    hands = np.zeros((n_games, 4, 40), dtype=bool)
+    hands[games[:, None], np.arange(40)[None, :] % 4, decks] = True
+
+    scores = np.zeros((n_games, 4), dtype=np.int64)
+    winner = np.zeros(n_games, dtype=np.int64)
+    atout = np.full(n_games, -1)
+
+    for i in range(10):
+        asked = np.full(n_games, -1)
+        table = np.zeros((n_games, 4), dtype=np.int64)
+
+        for j in range(4):
+            current = (j + winner) % 4
+            hand = hands[games, current]
+            playable = batch_playable_cards(hand, asked)
+
+            # Each strategy only plays the games where it is the current player
+            card = np.zeros(n_games, dtype=np.int64)
+            for s in set(strategies):
+                playing = np.flatnonzero(np.isin(current, [p for p in range(4) if strategies[p] == s]))
+                if len(playing):
+                    card[playing] = batch_strategies[s](hand[playing], playable[playing], asked[playing], atout[playing], rng)
+
+            hands[games, current, card] = False
+            table[games, current] = card
+
+            # Modify the currently asked suite and the atout
+            if j == 0:
+                asked = np_card_suit[card]
+            atout = np.where(atout < 0, asked, atout)
+
+        winner, points = batch_trick_result(table, asked, atout)
+        scores[games, winner] += points
+
+    return scores
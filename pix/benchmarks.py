@@ -0,0 +1,206 @@
+from collections import defaultdict
+import sys
+import gc
+import json
+import time
+import statistics
+
+from .cards import (
+    all_hand, attribute_cards, make_hand, playable_cards, popcount, remove_card, score, suit_of,
+    trick_result, win_round
+)
+from .strategies import dp_strategy, highest_strategy, random_strategy
+from .search import aggregators, evaluate_batch, hall_valid, heuristics
+from .engine import game, make_deal, play_rng
+
+# ==== BENCHMARKS ====
+# Times of the engine on fixed seeded deals, to measure the optimizations
+#  The micro benchmarks time the primitives and the heuristics on positions taken from seeded
+#  games, the macro benchmarks time the decisions of dp_strategy (by number of cards in the hand)
+#  and whole games for several mixes of strategies. Every result is in seconds (per call, per
+#  decision or per game). The results can be saved to a JSON file and compared to a baseline.
+#  Each benchmark is measured several times and the best measure is kept, which is much less
+#  noisy than the mean. The measures are taken in rounds over all the benchmarks, so a machine
+#  that is slower for a few seconds slows one measure of each benchmark, not all the measures of
+#  one. The spread of the measures (how much slower the median is than the best) is kept too: a
+#  benchmark is only slower than the baseline if it is slower by more than the tolerance and the
+#  noise of both runs.
+
+# One measure of the time of one call of fn
+#  A measure makes number calls, or more so that it lasts at least min_time seconds (a short
+#  measure is mostly noise). The number of calls is found by the first measure.
+class call_timer:
+
+    def __init__(self, fn, number=1, min_time=0.01):
+        self.fn = fn
+        self.number = number
+        self.min_time = min_time
+        self.calibrated = False
+
+    def __call__(self):
+        # Like timeit, the garbage collector does not run during the measure (the objects left by
+        #  the other benchmarks would be collected in this one)
+        gc.collect()
+        gc.disable()
+        try:
+            while True:
+                start = time.perf_counter()
+                for _ in range(self.number):
+                    self.fn()
+                elapsed = time.perf_counter() - start
+                if self.calibrated or elapsed >= self.min_time:
+                    break
+                self.number = max(2 * self.number, int(self.number * self.min_time / max(elapsed, 1e-9)) + 1)
+        finally:
+            gc.enable()
+        self.calibrated = True
+        return elapsed / self.number
+
+# Best measure and spread of the measures of a benchmark
+def best_and_spread(measures):
+    best = min(measures)
+    return best, (statistics.median(measures) - best) / best if best > 0 else 0.0
+
+# Wraps a strategy to time its decisions, by number of cards in the hand
+class timed_strategy:
+
+    def __init__(self, strategy, times):
+        self.strategy = strategy
+        self.times = times # Number of cards -> list of durations
+
+    def play_card(self, hand, playable_hand, asked, atout, winner, table, current):
+        start = time.perf_counter()
+        card = self.strategy.play_card(hand, playable_hand, asked, atout, winner, table, current)
+        self.times[popcount(hand)].append(time.perf_counter() - start)
+        return card
+
+    def update_played(self, table, asked, current):
+        self.strategy.update_played(table, asked, current)
+
+# Positions of seeded random games: (hand, asked, atout, table, deck) for every card played
+#  deck are the cards each player may have, like the beliefs of the dp strategy
+def benchmark_positions(n_games=20, seed=0):
+    positions = []
+    for s in range(seed, seed + n_games):
+        rng = play_rng(s)
+        log = []
+        board = attribute_cards(make_deal(s))
+        game(verbose=False, strategies=[random_strategy(rng) for _ in range(4)], log=log, deal=make_deal(s), rng=rng)
+        played = 0
+        atout = all_hand
+        for winner, table in log:
+            asked = suit_of[table[winner]]
+            if atout == all_hand:
+                atout = asked
+            hands = [remove_card(h, played) for h in board]
+            others = hands[1] | hands[2] | hands[3]
+            for i in range(4):
+                positions.append((hands[i], asked, atout, table, [hands[0], others, others, others]))
+            played |= make_hand(*table)
+    return positions
+
+# The benchmarks of each part are functions that take one measure of some benchmarks: they
+#  return {name: seconds}
+
+def micro_benchmarks(number=20):
+    positions = benchmark_positions()
+    benchmarks = []
+
+    def bench(name, fn, *args_list):
+        # Time fn over all the positions at once, per call
+        calls = len(args_list[0])
+        timer = call_timer(lambda: [fn(*args) for args in zip(*args_list)], number)
+        benchmarks.append(lambda: {name: timer() / calls})
+
+    def bench_batch(name, heuristic):
+        timer = call_timer(lambda: evaluate_batch(heuristic, decks, starts, atouts[0]), number)
+        benchmarks.append(lambda: {name: timer() / len(decks)})
+
+    hands, asked, atouts, tables, decks = zip(*positions)
+    bench("playable_cards", playable_cards, hands, asked)
+    bench("win_round", win_round, tables, asked, atouts)
+    bench("trick_result", trick_result, tables, asked, atouts)
+    bench("score", score, hands)
+    bench("hall_valid", hall_valid, decks, [popcount(d[0]) for d in decks])
+    starts = [0] * len(decks)
+    for name, heuristic in heuristics.items():
+        bench(f"heuristic {name}", heuristic, decks, starts, atouts)
+        bench_batch(f"heuristic batch {name}", heuristic)
+    return benchmarks
+
+# Mean time of the decisions of dp_strategy, by kick_in and by number of cards in the hand
+#  A measure plays the seeded games once, they take the same decisions every time.
+def decision_benchmarks(kick_ins=(3, 5, 7), n_games=3, heuristic="future (0.4)", aggregator="mean"):
+
+    def bench(kick_in):
+        def measure():
+            times = defaultdict(list)
+            for s in range(n_games):
+                rng = play_rng(s)
+                gen_dp = lambda: timed_strategy(dp_strategy(kick_in, heuristics[heuristic], aggregators[aggregator], rng=rng), times)
+                game(verbose=False, strategies=[gen_dp(), random_strategy(rng), gen_dp(), random_strategy(rng)], deal=make_deal(s), rng=rng)
+            return {f"play_card kick_in={kick_in} cards={cards}": statistics.mean(times[cards]) for cards in range(1, kick_in + 1)}
+        return measure
+
+    return [bench(kick_in) for kick_in in kick_ins]
+
+# Time of a whole game for each mix of strategies
+#  The games with dp strategies are much longer, fewer of them are played
+def game_benchmarks(n_games=100, n_dp_games=3):
+    mixes = {
+        "random": lambda rng: [random_strategy(rng) for _ in range(4)],
+        "highest": lambda rng: [highest_strategy(rng) for _ in range(4)],
+        "random vs highest": lambda rng: [random_strategy(rng), highest_strategy(rng), random_strategy(rng), highest_strategy(rng)],
+        "dp (5) vs random": lambda rng: [dp_strategy(5, heuristics["future (0.4)"], min, rng=rng), random_strategy(rng), dp_strategy(5, heuristics["future (0.4)"], min, rng=rng), random_strategy(rng)],
+        "dp (5) vs highest": lambda rng: [dp_strategy(5, heuristics["best_card_win"], statistics.mean, rng=rng), highest_strategy(rng), dp_strategy(5, heuristics["best_card_win"], statistics.mean, rng=rng), highest_strategy(rng)],
+    }
+
+    def bench(name, mix):
+        games = n_dp_games if name.startswith("dp") else n_games
+
+        def play_games():
+            for s in range(games):
+                rng = play_rng(s)
+                game(verbose=False, strategies=mix(rng), deal=make_deal(s), rng=rng)
+        timer = call_timer(play_games)
+        return lambda: {f"game {name}": timer() / games}
+
+    return [bench(name, mix) for name, mix in mixes.items()]
+
+# Run every benchmark and print the results
+#  path is the JSON file to save the results to, baseline a JSON file of results to compare with.
+#  Every benchmark is measured rounds times. A benchmark is a regression when it is slower than the
+#  baseline by more than the tolerance plus 2 times the largest spread of the two runs.
+#  Returns the results and the names of the benchmarks that are slower than the baseline.
+def run_benchmarks(path=None, baseline=None, tolerance=0.1, rounds=5):
+    benchmarks = micro_benchmarks() + decision_benchmarks() + game_benchmarks()
+    measures = defaultdict(list)
+    for _ in range(rounds):
+        for measure in benchmarks:
+            for name, t in measure().items():
+                measures[name].append(t)
+    results, spreads = {}, {}
+    for name in measures:
+        results[name], spreads[name] = best_and_spread(measures[name])
+
+    regressions = []
+    previous, previous_spreads = {}, {}
+    if baseline is not None:
+        with open(baseline) as f:
+            saved = json.load(f)
+        previous, previous_spreads = saved["results"], saved.get("spreads", {})
+    for name, t in results.items():
+        print(f"{name:45} {1e6 * t:14.2f}us +-{100 * spreads[name]:5.1f}%", end="")
+        if name in previous:
+            ratio = t / previous[name]
+            limit = tolerance + 2 * max(spreads[name], previous_spreads.get(name, 0))
+            print(f" {ratio:6.2f}x", end="")
+            if ratio > 1 + limit:
+                regressions.append(name)
+                print(" REGRESSION", end="")
+        print()
+
+    if path is not None:
+        with open(path, "w") as f:
+            json.dump({"python": sys.version.split()[0], "date": time.strftime("%Y-%m-%d %H:%M:%S"), "results": results, "spreads": spreads}, f, indent=1)
+    return results, regressions
@@ -0,0 +1,225 @@
+import os
+import mmap
+import struct
+from collections import defaultdict
+
+from .cards import all_hand, attribute_cards, card_points, first, hand_to_list, playable_cards, popcount, suit_of, suits
+from .strategies import belief_state
+from .search import heuristics
+from .endgame import deal_totals, round_pins, sample_deal
+from .engine import make_deal, play_rng
+
+# ==== OPENING BOOK ====
+# In the first round, the search would have to look at hands of 10 cards, so the dp strategy plays
+#  at random until it kicks in. The opening book has the card to play in the first round, found
+#  offline by large sampling searches (see build_opening_book), for patterns of positions.
+#  A pattern keeps what matters in the first round:
+#   the player position in the round, and if the atout is known (and if it is the asked suit or if
+#    the game has no atout)
+#   the pattern of each suit: the number of cards (4 for 4 or more) and the ace, king and 10. A
+#    player that has the asked suit must play it, so only the pattern of the asked suit is kept
+#   the best card on the table: its rank, if it is an atout of another suit than the asked one and
+#    if the partner plays it, and the points on the table (0, 5, 10 or 15 and more)
+#  The suits are in the order atout, asked suit, then the other suits by pattern, so the hands that
+#  only differ by a swap of suits have the same pattern. The card of a pattern is an action: a suit
+#  of the order and a kind of card (the ace, the king, the 10, the highest or the lowest other card).
+#  The book is a file of open addressing hash table that is memory mapped: a lookup reads a few
+#  bytes of the file, whatever the size of the book.
+
+# Ranks of the honors in a suit (ace, king and 10) and their mask in the 10 cards of a suit
+book_honors = (0, 1, 4)
+book_honor_mask = 0b10011
+
+# Pattern of the cards of a suit (the 10 bits of the suit): number of cards and honors, on 6 bits
+def suit_pattern(cards):
+    return min(popcount(cards), 4) << 3 | (cards & 1) << 2 | (cards >> 1 & 1) << 1 | (cards >> 4 & 1)
+
+# The suits (0 to 3) in the order of the pattern: atout, asked suit, then the others by pattern
+#  asked and atout are hands, all_hand if they are not known
+def pattern_suits(hand, asked, atout):
+    order = []
+    for known in (atout, asked):
+        for s in range(4):
+            if suits[s] == known and s not in order:
+                order.append(s)
+    rest = [s for s in range(4) if s not in order]
+    return order + sorted(rest, key=lambda s: -suit_pattern(hand >> 10 * s & 0x3ff))
+
+# Key of the pattern of a position of the first round
+#  played are the cards of the round, from the player that started it
+def book_key(hand, order, asked, atout, played):
+    key = len(played) << 2 | (0 if atout == all_hand else 3 if not atout else 1 if atout == asked else 2)
+    follow = played and hand & asked
+    for s in order:
+        key = key << 6 | (suit_pattern(hand >> 10 * s & 0x3ff) if not follow or suits[s] == asked else 0)
+    if played:
+        # Like trick_result: the atouts, then the asked suit, by index
+        best = min(range(len(played)), key=lambda k: (not atout >> played[k] & 1, not asked >> played[k] & 1, played[k]))
+        card = played[best]
+        points = sum(card_points[c] for c in played)
+        key = key << 4 | card % 10
+        key = key << 1 | (atout != asked and atout >> card & 1)
+        key = key << 1 | (len(played) - best == 2)
+        key = key << 2 | min(points // 5, 3)
+    return key
+
+# Action of the card c in the pattern (None if the card is not the highest or the lowest other card)
+def card_action(hand, order, c):
+    slot, rank = order.index(c // 10), c % 10
+    if rank in book_honors:
+        return slot * 5 + book_honors.index(rank)
+    others = hand >> (c - rank) & 0x3ff & ~book_honor_mask
+    if rank == first(others):
+        return slot * 5 + 3
+    if rank == others.bit_length() - 1:
+        return slot * 5 + 4
+    return None
+
+# Card of the action in the hand (-1 if the hand has no such card)
+def action_card(hand, order, action):
+    slot, kind = divmod(action, 5)
+    s = order[slot]
+    cards = hand >> 10 * s & 0x3ff
+    if kind < 3:
+        rank = book_honors[kind]
+        return s * 10 + rank if cards >> rank & 1 else -1
+    others = cards & ~book_honor_mask
+    if not others:
+        return -1
+    return s * 10 + (first(others) if kind == 3 else others.bit_length() - 1)
+
+# The file of the book: a header (magic, log2 of the size of the table, number of patterns), the keys
+#  of the table (8 bytes each, key + 1, 0 for an empty slot) and the actions (1 byte each)
+book_header = struct.Struct("<8sQQ")
+book_magic = b"PIXBOOK1"
+
+# Slot of a key in a table of 2^bits slots (Fibonacci hashing)
+def book_slot(key, bits):
+    return (key * 0x9E3779B97F4A7C15 & 0xFFFFFFFFFFFFFFFF) >> (64 - bits)
+
+# Save the actions of the patterns (key -> action) to a book file, the table is at most half full
+def save_opening_book(path, entries):
+    bits = max(len(entries) * 2 - 1, 1).bit_length()
+    size = 1 << bits
+    keys = [0] * size
+    actions = bytearray(size)
+    for key, action in entries.items():
+        i = book_slot(key, bits)
+        while keys[i]:
+            i = (i + 1) & (size - 1)
+        keys[i] = key + 1
+        actions[i] = action
+    with open(path, "wb") as f:
+        f.write(book_header.pack(book_magic, bits, len(entries)))
+        f.write(struct.pack(f"<{size}Q", *keys))
+        f.write(actions)
+
+# Memory mapped opening book
+class opening_book:
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.bits, self.count = book_header.unpack_from(self.data, 0)
+        if magic != book_magic:
+            raise ValueError("not an opening book", path)
+        self.actions = book_header.size + (8 << self.bits)
+
+    def __len__(self):
+        return self.count
+
+    # Action of a pattern (None if the pattern is not in the book)
+    def get(self, key):
+        mask = (1 << self.bits) - 1
+        i = book_slot(key, self.bits)
+        while True:
+            stored = struct.unpack_from("<Q", self.data, book_header.size + 8 * i)[0]
+            if stored == 0:
+                return None
+            if stored == key + 1:
+                return self.data[self.actions + i]
+            i = (i + 1) & mask
+
+    # Card to play in the first round (-1 if the book does not know the position)
+    #  Same arguments as dp_strategy.play_card, asked and atout are all_hand if they are not known
+    def card(self, hand, playable_hand, asked, atout, played):
+        order = pattern_suits(hand, asked, atout)
+        action = self.get(book_key(hand, order, asked, atout, played))
+        if action is None:
+            return -1
+        card = action_card(hand, order, action)
+        return card if card != -1 and playable_hand >> card & 1 else -1
+
+    def close(self):
+        self.data.close()
+        self.file.close()
+
+# Values of the actions of the patterns met in the first round of the deals of seeds
+#  Each player of the round searches its position: samples deals that agree with what it knows are
+#  played for depth rounds and then valued by the heuristic (like sampling_search). The card that
+#  is played is a random one, so the next players meet all kinds of tables.
+#  atout is None for the atout of the first card (first_led_rule) or the atout of the game (0 for
+#  a game without atout).
+#  Returns key -> [sum of the values of each action, number of values of each action].
+def book_chunk(seeds, samples, depth, heuristic, atout=None):
+    stats = {}
+    for s in seeds:
+        rng = play_rng(s)
+        board = attribute_cards(make_deal(s))
+        played = []
+        cache = {} # The tables of the searches of one deal are not shared with the next deal
+        for seat in range(4):
+            hand = board[seat]
+            asked = suit_of[played[0]] if played else all_hand
+            seen_atout = atout if atout is not None else asked
+            playable = playable_cards(hand, asked)
+            leader, pinned = round_pins(played)
+            belief = belief_state(hand)
+            deals = [d for d in (sample_deal(belief, pinned, rng) for _ in range(samples)) if d is not None]
+            totals, n_deals = deal_totals(deals, seen_atout, played, playable, cache, depth, heuristics[heuristic])
+            if n_deals:
+                order = pattern_suits(hand, asked, seen_atout)
+                values = stats.setdefault(book_key(hand, order, asked, seen_atout, played), [0.0] * 20 + [0] * 20)
+                for total, c in zip(totals, hand_to_list(playable)):
+                    action = card_action(hand, order, c)
+                    if action is not None:
+                        values[action] += total / n_deals
+                        values[20 + action] += 1
+            played.append(rng.choice(hand_to_list(playable)))
+    return stats
+
+# Build the opening book of the first round of n_deals deals and save it to path
+#  The deals are make_deal(base_seed) to make_deal(base_seed + n_deals - 1), searched in chunks of
+#  chunk_size deals on a pool of processes (like run_tournament). The action of a pattern is the one
+#  with the best mean value over the positions of the pattern. Returns the number of patterns.
+def build_opening_book(path, n_deals=10000, samples=50, depth=1, heuristic="future (0.4)", atout=None, workers=None, chunk_size=100, base_seed=0, verbose=True):
+    seeds = list(range(base_seed, base_seed + n_deals))
+    chunks = [seeds[i:i + chunk_size] for i in range(0, len(seeds), chunk_size)]
+
+    from concurrent.futures import ProcessPoolExecutor
+    pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count()) if workers != 1 else None
+    try:
+        if pool is not None:
+            parts = (f.result() for f in [pool.submit(book_chunk, chunk, samples, depth, heuristic, atout) for chunk in chunks])
+        else:
+            parts = (book_chunk(chunk, samples, depth, heuristic, atout) for chunk in chunks)
+
+        stats = defaultdict(lambda: [0.0] * 20 + [0] * 20)
+        for k, part in enumerate(parts):
+            for key, values in part.items():
+                merged = stats[key]
+                for a in range(40):
+                    merged[a] += values[a]
+            if verbose:
+                print(f"{min((k + 1) * chunk_size, n_deals)}/{n_deals} deals, {len(stats)} patterns", flush=True)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    entries = {}
+    for key, values in stats.items():
+        seen = [a for a in range(20) if values[20 + a]]
+        if seen:
+            entries[key] = max(seen, key=lambda a: values[a] / values[20 + a])
+    save_opening_book(path, entries)
+    return len(entries)
@@ -0,0 +1,232 @@
+import random
+import sys
+
+# ==== UTILS ====
+
+# Create a deck of 40 cards that is shuffled
+#  rng is the random generator to use (random.Random(seed) to get the same deck again)
+def create_deck(rng=random):
+    deck =  list(range(40))
+    rng.shuffle(deck)
+    return deck
+
+# Attribute the cards to the players randomly
+#  With seat_shift, the hands are given to the players seat_shift seats further
+def attribute_cards(deck, seat_shift=0):
+    H = [0, 0, 0, 0]
+
+    for i,c in enumerate(deck):
+        H[(i + seat_shift)%4] |= 1 << c
+
+    return H
+
+# One hot encoding of the cards
+#  A one hot encoding is a representation of categorical variables as binary vectors
+#   where each value is mapped to a single value in the binary vector.
+one_hot = [
+  "AH", "KH", "QH", "JH", "10H", "9H", "8H", "7H", "6H", "5H",
+  "AD", "KD", "QD", "JD", "10D", "9D", "8D", "7D", "6D", "5D",
+  "AC", "KC", "QC", "JC", "10C", "9C", "8C", "7C", "6C", "5C",
+  "AS", "KS", "QS", "JS", "10S", "9S", "8S", "7S", "6S", "5S"
+]
+
+# Cards are identified by their index in the one hot encoding (0-39)
+#  The names are only used to display the cards
+card_index = {c: i for i, c in enumerate(one_hot)}
+
+# Hands are bitboards
+#  A hand is a single integer where bit i is set if the hand contains the card one_hot[i].
+#  Intersection, union and counting the cards of a hand are then one integer operation
+#  instead of building a new 40-element list.
+
+# Define the suits
+hearts =   sum(1 << i for i, x in enumerate(one_hot) if x[-1] == "H")
+diamonds = sum(1 << i for i, x in enumerate(one_hot) if x[-1] == "D")
+clubs =    sum(1 << i for i, x in enumerate(one_hot) if x[-1] == "C")
+spades =   sum(1 << i for i, x in enumerate(one_hot) if x[-1] == "S")
+all_hand = (1 << 40) - 1
+
+# The suit of each card (as a hand)
+suit_of = [hearts] * 10 + [diamonds] * 10 + [clubs] * 10 + [spades] * 10
+
+# The suits, in the one hot order
+suits = [hearts, diamonds, clubs, spades]
+
+# Helper function to create a hand from a list of cards
+def make_hand(*args):
+    hand = 0
+    for a in args:
+        hand |= 1 << a
+    return hand
+
+# Intersection of two hands
+def dot(a,b):
+    return a & b
+
+# Union of two hands
+def add(a, b):
+    return a | b
+
+# Like add. Kept for the places where the union of the hands was capped
+def add_cap(a, b):
+    return a | b
+
+# Union of multiple hands
+def madd(*args):
+    hand = 0
+    for a in args:
+        hand |= a
+    return hand
+
+# Number of cards in a hand (int.bit_count is Python 3.10 or later, the count of the binary string
+#  before)
+if hasattr(int, "bit_count"):
+    def popcount(hand):
+        return hand.bit_count()
+else:
+    def popcount(hand):
+        return bin(hand).count("1")
+
+# Precalculate the cards that are worth points
+fives = make_hand(*[card_index[c] for c in ("5H", "5D", "5C", "5S")])
+tens = make_hand(*[card_index[c] for c in ("10H", "10D", "10C", "10S", "AH", "AD", "AC", "AS")])
+
+# Calculate the score of a board
+def score(board):
+    # The 5 are worth 5 points, the 10 and the aces are worth 10 points
+    return 5 * popcount(board & fives) + 10 * popcount(board & tens)
+
+# Precalculate the points of each card (by index)
+card_points = [score(1 << i) for i in range(40)]
+
+# Tells if x is a numpy array
+#  numpy is optional and takes longer to import than the whole engine, so it is only imported by the
+#  code that needs it (see BATCH SIMULATION). If it is not imported yet, x cannot be an array.
+def is_array(x):
+    np = sys.modules.get("numpy")
+    return np is not None and isinstance(x, np.ndarray)
+
+# Inverse a hand (1 -> 0, 0 -> 1)
+def inv(a):
+    return all_hand ^ a
+
+
+# Get n random cards
+def random_cards(n, rng=random):
+    c = list(range(40))
+    rng.shuffle(c)
+    return make_hand(*c[:n])
+
+# Print the cards in a human readable format
+def print_cards(deck):
+    print("{", end="")
+    for c in hand_to_list(deck):
+        print(one_hot[c], end=",")
+    print("}")
+
+# Get the playable cards in a hand
+def playable_cards(hand, asked):
+    if not asked:
+        return hand
+
+    colored_hand = dot(hand, asked)
+    if colored_hand:
+        return colored_hand 
+    else:
+        return hand
+
+# Convert a hand to a list of cards
+def hand_to_list(hand):
+    val = []
+    while hand:
+        lowest = hand & -hand
+        val.append(lowest.bit_length() - 1)
+        hand ^= lowest
+    return val
+
+# Returns the first card in the hand, starting from the left
+def first(hand):
+    return (hand & -hand).bit_length() - 1
+
+# Remove a card from a hand
+def remove_card(hand, card):
+    return hand & ~card
+
+# Print the board
+def print_board(board):
+    for i, b in enumerate(board):
+        print("Player", i+1, ":")
+        print_cards(b)
+
+def mask_atout(card1, asked, atout):
+    # It works by masking the cards with the asked suit and the "atout"
+    mask = add(asked, atout)
+
+    return dot(card1, mask)
+
+# Helper function to get the highest card of any suite
+def get_highest_any_suite(hand):
+    lowest_v = 40
+    highest = -1
+
+    for suite in [hearts, diamonds, clubs, spades]:
+        hand_masked = dot(hand, suite)
+        if hand_masked:
+            v = first(hand_masked) - first(suite)
+            if lowest_v > v:
+                lowest_v = v
+                highest = first(hand_masked)
+
+    return highest
+
+# Compare two cards
+def higher(card1, card2, asked, atout):
+    # An atout beats the asked suit. Among the cards of the same kind, it is the same order as
+    # comparing the one hot lists: the first card (from the left) that is in only one of the
+    # two hands decides
+    mask = atout if (card1 | card2) & atout else asked
+    diff = dot(card1, mask) ^ dot(card2, mask)
+    return (card1 & diff & -diff) != 0
+
+# Tells if a table of cards wins or not
+def win_round(cards, asked, atout):
+    return trick_result(cards, asked, atout)[0]
+
+# Winner and points of a round, from the four cards on the table
+#  Like higher, the atouts beat the cards of the asked suit, and among them the winning card
+#  is the one with the smallest index, so there is no need to build any hand. The atouts are
+#  ranked 40 below their index. Before the atout is chosen (all_hand), every card is an atout
+#  and the smallest index wins. Without atout (0), only the asked suit can win.
+def trick_result(cards, asked, atout):
+    best = 0
+    best_card = 40
+    for i, c in enumerate(cards):
+        if atout >> c & 1:
+            rank = c - 40
+        elif asked >> c & 1:
+            rank = c
+        else:
+            continue
+        if rank < best_card:
+            best = i
+            best_card = rank
+
+    return best, card_points[cards[0]] + card_points[cards[1]] + card_points[cards[2]] + card_points[cards[3]]
+
+# Print the score of a round
+def print_score(scores):
+    print(f"{scores[0] + scores[2]} vs {scores[1] + scores[3]} :", end=" ")
+    for i, s in enumerate(scores):
+        print(f"P{i+1}={s}", end=" ")
+    print()
+
+# Print the played cards of a round
+def print_round(round, winner, played):
+    print(f"Round {round} - ", end="")
+    for i, p in enumerate(played):
+        to_show = f"P{i+1}={one_hot[p]}"
+        if i == winner:
+            print(f"*{to_show}*", end=" ")
+        else:
+            print(to_show, end=" ")
+    print()
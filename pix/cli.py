@@ -0,0 +1,115 @@
+import sys
+import argparse
+import statistics
+
+from .cards import print_score
+from .strategies import dp_strategy, random_strategy
+from .search import best_card_win_heuristique
+
+# ==== MAIN ====
+# python -m pix <command>
+#  single     Play one game (dp strategies against random bots) and print it
+#  sweep      Play the tournament of all the hypothesis (the default command)
+#  benchmark  Run the benchmarks (see BENCHMARKS)
+#  serve      Run the bot server on stdin and stdout, or on a unix socket (see BOT SERVER)
+#  book       Build an opening book (see OPENING BOOK)
+#  The modules are only imported by the commands that use them.
+
+# The cells of the sweep: (heuristic, aggregator, kick_in, other, dp_first)
+def sweep_cells():
+    # Testing all hypothesis
+    cells = []
+    for heuristic in [
+        "future (0.4)",
+        "future (0.6)",
+        "best_card_win",
+        # "hand point"
+    ]:
+        for aggregator in [
+            #"mean + utility",
+            "cutoff 25%",
+            "mean",
+            "min",
+            "cutoff 45%"
+        ]:
+            for kick_in in [5, 10]:
+                for other in [
+                    "random bot",
+                    # "highest bot"
+                ]:
+                    for dp_first in [True, False]:
+                        cells.append((heuristic, aggregator, kick_in, other, dp_first))
+    return cells
+
+def run_single():
+    from .engine import game
+    score = game(verbose=True, strategies=[
+                   dp_strategy(5, best_card_win_heuristique, statistics.mean),
+                   random_strategy(),
+                   dp_strategy(5, best_card_win_heuristique, statistics.mean),
+                   random_strategy()
+               ])
+    print_score(score)
+
+# sweep_mode is "fixed" (100 games per cell), "adaptive" (run_adaptive) or "halving" (successive_halving)
+#  results_file is the path of a file to save the games of the sweep (the sweep resumes from it) and
+#  corpus_file the path of a deal corpus (all the cells of the sweep then play the same deals).
+#  With profile_search, the search statistics of each cell are printed.
+def run_sweep(sweep_mode="fixed", results_file=None, corpus_file=None, profile_search=False):
+    from .tournament import run_tournament, run_adaptive, successive_halving
+    cells = sweep_cells()
+    if sweep_mode == "adaptive":
+        run_adaptive(cells, results=results_file, paired=corpus_file is not None, corpus=corpus_file)
+    elif sweep_mode == "halving":
+        successive_halving(cells, results=results_file, paired=corpus_file is not None, corpus=corpus_file)
+    else:
+        run_tournament(cells, n_games=100, results=results_file, paired=corpus_file is not None, corpus=corpus_file, profile=profile_search)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="pix", description="The game of 10 and its dp strategy")
+    commands = parser.add_subparsers(dest="command")
+
+    commands.add_parser("single", help="play one game and print it")
+
+    sweep = commands.add_parser("sweep", help="play the tournament of all the hypothesis")
+    sweep.add_argument("--mode", choices=["fixed", "adaptive", "halving"], default="fixed")
+    sweep.add_argument("--results", help="file to save the games to (the sweep resumes from it)")
+    sweep.add_argument("--corpus", help="deal corpus, all the cells then play the same deals")
+    sweep.add_argument("--profile", action="store_true", help="print the search statistics of each cell")
+
+    benchmark = commands.add_parser("benchmark", help="run the benchmarks")
+    benchmark.add_argument("--save", help="JSON file to save the results to")
+    benchmark.add_argument("--baseline", help="JSON results of a previous run, to flag the regressions")
+
+    serve = commands.add_parser("serve", help="run the bot server")
+    serve.add_argument("--socket", help="unix socket to serve on (stdin and stdout by default)")
+    serve.add_argument("--latency", type=float, default=0.2, help="time to answer a move, in seconds")
+    serve.add_argument("--book", help="opening book of the first round")
+
+    book = commands.add_parser("book", help="build an opening book")
+    book.add_argument("path", help="file of the book")
+    book.add_argument("--deals", type=int, default=10000, help="number of deals to search")
+    book.add_argument("--samples", type=int, default=50, help="samples of each search")
+    book.add_argument("--depth", type=int, default=1, help="rounds played in each sample before the heuristic")
+    book.add_argument("--workers", type=int, help="number of processes (all the cpus by default)")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "single":
+        run_single()
+    elif args.command == "benchmark":
+        from .benchmarks import run_benchmarks
+        run_benchmarks(args.save, args.baseline)
+    elif args.command == "serve":
+        from .server import serve, serve_socket, bot_strategy
+        if args.socket is not None:
+            serve_socket(args.socket, bot_strategy(args.latency, book=args.book))
+        else:
+            serve(sys.stdin, sys.stdout, bot_strategy(args.latency, book=args.book))
+    elif args.command == "book":
+        from .book import build_opening_book
+        print(build_opening_book(args.path, args.deals, args.samples, args.depth, workers=args.workers), "patterns")
+    elif args.command == "sweep":
+        run_sweep(args.mode, args.results, args.corpus, args.profile)
+    else:
+        run_sweep()
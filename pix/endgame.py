@@ -0,0 +1,193 @@
+import random
+import math
+from itertools import combinations
+
+from .cards import (
+    add_cap, all_hand, dot, hand_to_list, make_hand, playable_cards, popcount, remove_card,
+    suit_of, trick_result
+)
+from .search import search_timeout
+
+# ==== ENDGAME SOLVER ====
+# In the last tricks, there are few ways to deal the cards that are left. The solver goes through
+#  every deal that agrees with the beliefs (dp_strategy.left) and plays each of them exactly, every
+#  player knowing every hand. The value of a card is the mean over the deals.
+#  Like in dp_algorithm, the player 0 is the one that is playing and the values are the points of
+#  the team of the player 0 minus the points of the other team.
+
+# Every deal of the unknown cards that agrees with the beliefs
+#  pinned[i] is the card the player i already played in this round (None if he did not play yet),
+#  it is still in the hand. Every player has as many cards as the player 0.
+def endgame_deals(left, pinned):
+    size = popcount(left[0])
+    pins = [0 if c is None else 1 << c for c in pinned]
+    pool = remove_card(add_cap(add_cap(left[1], left[2]), left[3]), add_cap(add_cap(pins[1], pins[2]), pins[3]))
+
+    def deal_from(i, pool, hands):
+        if i == 3:
+            # The last player takes the rest
+            if remove_card(pool, left[3]) == 0:
+                yield hands + [add_cap(pool, pins[3])]
+            return
+        need = size - (1 if pins[i] else 0)
+        for cards in combinations(hand_to_list(dot(pool, left[i])), need):
+            hand = make_hand(*cards)
+            yield from deal_from(i + 1, remove_card(pool, hand), hands + [add_cap(hand, pins[i])])
+
+    yield from deal_from(1, pool, [left[0]])
+
+# Value of a round where every hand is known, with alpha-beta pruning
+#  played are the cards of the round, from the player that started it (leader).
+#  With a depth, only depth rounds are played (this one included) and the heuristic gives the value of the rest
+def endgame_play(hands, leader, atout, played, alpha, beta, cache, depth=math.inf, heuristic=None, budget=None):
+    n = len(played)
+    if n == 4:
+        winner, points = trick_result(played, suit_of[played[0]], atout)
+        winner = (leader + winner) % 4
+        value = points if winner % 2 == 0 else -points
+        if hands[0] == 0:
+            return value
+        return value + endgame_search(hands, winner, atout, alpha - value, beta - value, cache, depth - 1, heuristic, budget)
+
+    player = (leader + n) % 4
+    hand = hands[player]
+    playable = playable_cards(hand, suit_of[played[0]]) if n else hand
+    maximize = player % 2 == 0
+    best = -math.inf if maximize else math.inf
+    for c in hand_to_list(playable):
+        next_hands = hands[:]
+        next_hands[player] = remove_card(hand, 1 << c)
+        # The first card of the game chooses the atout
+        next_atout = suit_of[c] if n == 0 and atout == all_hand else atout
+        v = endgame_play(next_hands, leader, next_atout, played + [c], alpha, beta, cache, depth, heuristic, budget)
+        if maximize:
+            best = max(best, v)
+            alpha = max(alpha, v)
+        else:
+            best = min(best, v)
+            beta = min(beta, v)
+        if alpha >= beta:
+            break
+    return best
+
+# Value of the rest of the game at the start of a round
+#  The cache keeps a lower and an upper bound of each position it saw (the exact value when both
+#  are the same). The positions do not depend on the beliefs, so the cache is good for the whole game.
+def endgame_search(hands, leader, atout, alpha, beta, cache, depth=math.inf, heuristic=None, budget=None):
+    if depth == 0:
+        return heuristic(hands, leader, atout)
+    if budget is not None:
+        budget.tick()
+    key = (*hands, leader, atout, depth, heuristic)
+    lower, upper = cache.get(key, (-math.inf, math.inf))
+    if lower >= beta or lower == upper:
+        return lower
+    if upper <= alpha:
+        return upper
+    alpha = max(alpha, lower)
+    beta = min(beta, upper)
+
+    value = endgame_play(hands, leader, atout, [], alpha, beta, cache, depth, heuristic, budget)
+    if value <= alpha:
+        upper = value
+    elif value >= beta:
+        lower = value
+    else:
+        lower = upper = value
+    cache[key] = (lower, upper)
+    return value
+
+# The player that started the current round and the card each player played in it
+def round_pins(played):
+    leader = (4 - len(played)) % 4
+    pinned = [None] * 4
+    for k, c in enumerate(played):
+        pinned[(leader + k) % 4] = c
+    return leader, pinned
+
+# Total value over the deals of each card the player 0 can play, and the number of deals
+#  With a search_budget, the deals are solved until the budget is spent: the totals are the ones
+#  of the deals solved before.
+def deal_totals(deals, atout, played, playable, cache, depth=math.inf, heuristic=None, budget=None):
+    leader, pinned = round_pins(played)
+    cards = hand_to_list(playable)
+    totals = [0] * len(cards)
+    n_deals = 0
+    for deal in deals:
+        # The cards of the round are not in the hands anymore
+        hands = [remove_card(deal[i], 0 if pinned[i] is None else 1 << pinned[i]) for i in range(4)]
+        values = []
+        try:
+            for c in cards:
+                next_hands = hands[:]
+                next_hands[0] = remove_card(hands[0], 1 << c)
+                next_atout = suit_of[c] if not played and atout == all_hand else atout
+                values.append(endgame_play(next_hands, leader, next_atout, played + [c], -math.inf, math.inf, cache, depth, heuristic, budget))
+        except search_timeout:
+            break
+        totals = [x + y for x, y in zip(totals, values)]
+        n_deals += 1
+    return totals, n_deals
+
+# The best card of the totals of deal_totals, with its mean value ((0, None) if there is no deal)
+def best_of_totals(playable, totals, n_deals):
+    if n_deals == 0:
+        return (0, None)
+    cards = hand_to_list(playable)
+    best = max(range(len(cards)), key=lambda k: totals[k])
+    return (totals[best] / n_deals, cards[best])
+
+# Value of each card the player 0 can play, in the mean over the deals
+#  Returns (value, card) of the best card, like dp_algorithm ((0, None) if there is no deal).
+#  With workers, the deals are solved on the root pool (see parallel_solve_deals), without budget.
+def solve_deals(deals, atout, played, playable, cache, depth=math.inf, heuristic=None, workers=None, budget=None):
+    if workers is not None and workers > 1:
+        from .parallel import parallel_solve_deals # parallel uses the solver too
+        return parallel_solve_deals(list(deals), atout, played, playable, depth, heuristic, workers)
+    return best_of_totals(playable, *deal_totals(deals, atout, played, playable, cache, depth, heuristic, budget))
+
+# Exact value of the best card the player 0 can play
+#  played are the cards of the current round, from the player that started it.
+def endgame_solver(left, atout, played, playable, cache, workers=None, budget=None):
+    leader, pinned = round_pins(played)
+    return solve_deals(endgame_deals(left, pinned), atout, played, playable, cache, workers=workers, budget=budget)
+
+
+# ==== SAMPLING ====
+# Earlier in the game there are far too many deals to go through all of them. The sampling search
+#  draws a fixed number of deals that agree with the beliefs and solves each of them like the
+#  endgame solver, for a few rounds followed by the heuristic. The cost of a move depends on the
+#  number of samples and on the depth, not on how many cards the other players may have.
+
+# Draw a deal of the unknown cards that agrees with the belief_state (pinned like in endgame_deals)
+#  The cards that the fewest players can hold are given first, each one to a random player that
+#  can hold it and still has room, following the probabilities of the beliefs. Starts again when
+#  a card cannot be given, None after tries failures.
+def sample_deal(belief, pinned, rng, tries=100):
+    left = belief.hands
+    size = popcount(left[0])
+    pins = [0 if c is None else 1 << c for c in pinned]
+    pool = remove_card(add_cap(add_cap(left[1], left[2]), left[3]), add_cap(add_cap(pins[1], pins[2]), pins[3]))
+    holders = {c: [i for i in range(1, 4) if belief.prob(i, c) > 0] for c in hand_to_list(pool)}
+    order = sorted(holders, key=lambda c: (len(holders[c]), rng.random()))
+
+    for _ in range(tries):
+        hands = [left[0], pins[1], pins[2], pins[3]]
+        room = [0] + [size - (1 if pins[i] else 0) for i in range(1, 4)]
+        for c in order:
+            choices = [i for i in holders[c] if room[i]]
+            if not choices:
+                break
+            i = rng.choices(choices, [belief.prob(j, c) for j in choices])[0]
+            hands[i] = add_cap(hands[i], 1 << c)
+            room[i] -= 1
+        else:
+            return hands
+    return None
+
+# Value of the best card the player 0 can play, in the mean over samples deals
+#  Each deal is played for depth rounds (this one included), then the heuristic gives the value of the rest.
+def sampling_search(belief, atout, played, playable, cache, samples, depth, heuristic, rng=random, workers=None, budget=None):
+    leader, pinned = round_pins(played)
+    deals = [sample_deal(belief, pinned, rng) for _ in range(samples)]
+    return solve_deals([d for d in deals if d is not None], atout, played, playable, cache, depth, heuristic, workers, budget)
@@ -0,0 +1,279 @@
+import random
+import mmap
+
+from .cards import (
+    attribute_cards, create_deck, dot, one_hot, popcount, print_board, print_round, score, suit_of,
+    suits, trick_result
+)
+from .strategies import random_strategy
+
+# ==== GAME ENGINE ====
+# The rules of a game and the state of the game being played
+#  The state is a small mutable object (the hands are bitboards) that the engine updates card by
+#  card, instead of building new lists for every card. The legal cards of each player are
+#  computed once per round, when the asked suit is known.
+#  The atout depends on the rules: the suit of the first card of the game (the rule of the
+#  README), a fixed suit, no atout at all or the suit of the player that wins the bet. The atout of
+#  the state is a hand, 0 while it is not chosen (and for the whole game without atout).
+
+class game_state:
+    __slots__ = ("hands", "legal", "table", "scores", "leader", "asked", "atout", "round", "bet")
+
+    def __init__(self):
+        self.hands = [0, 0, 0, 0]
+        self.legal = [0, 0, 0, 0] # Cards each player may play in the current round
+        self.table = [None, None, None, None]
+        self.scores = [0, 0, 0, 0]
+        self.leader = 0 # Player that starts the current round (the winner of the last one)
+        self.asked = 0
+        self.atout = 0
+        self.round = 0
+        self.bet = None # (declarer, points) when the atout was chosen by a bet
+
+    # Start a new game with the hands of board
+    def reset(self, board):
+        self.hands[:] = board
+        self.legal[:] = board
+        self.table = [None, None, None, None]
+        self.scores = [0, 0, 0, 0]
+        self.leader = 0
+        self.asked = 0
+        self.atout = 0
+        self.round = 0
+        self.bet = None
+
+# The atout is the suit of the first card of the game
+class first_led_rule:
+
+    def start(self, state, strategies):
+        pass
+
+    def led(self, state):
+        if not state.atout:
+            state.atout = state.asked
+
+    # The atout told to the strategies (False if it is not known yet)
+    def visible_atout(self, state):
+        return state.atout or False
+
+# The atout is the same suit for the whole game
+#  leader is the player that starts the first round
+class fixed_atout_rule:
+
+    def __init__(self, atout, leader=0):
+        self.atout = atout
+        self.leader = leader
+
+    def start(self, state, strategies):
+        state.atout = self.atout
+        state.leader = self.leader
+
+    def led(self, state):
+        pass
+
+    def visible_atout(self, state):
+        return state.atout
+
+# No atout: only the asked suit wins the round
+#  The strategies see the atout 0 (no suit is an atout), that the searches and trick_result play.
+class no_atout_rule:
+
+    def __init__(self, leader=0):
+        self.leader = leader
+
+    def start(self, state, strategies):
+        state.leader = self.leader
+
+    def led(self, state):
+        pass
+
+    def visible_atout(self, state):
+        return 0
+
+# Suit that a hand would bet on and the points it can bet
+#  The suit is the one with the most cards (then the most points). The hand expects its points
+#  and 10 points per card of the suit.
+def default_bid(hand):
+    best_suit = max(suits, key=lambda s: (popcount(dot(hand, s)), score(dot(hand, s))))
+    return score(hand) + 10 * popcount(dot(hand, best_suit)), best_suit
+
+# Bet of a hand on default_bid, or None to pass
+#  The points are a multiple of step, at most 100, and must be higher than best (the highest bet
+#  so far, 0 if none) and at least minimum.
+def default_bet(hand, best, minimum=50, step=5):
+    points, suit = default_bid(hand)
+    points = min(points - points % step, 100 - 100 % step)
+    return (points, suit) if points >= max(minimum, best + step) else None
+
+# The players bet on the points their team will make, the highest bet chooses the atout and starts
+#  Each player bets once, from the player first. A strategy with a bid(hand, best) method bets
+#  itself: it returns (points, suit) or None to pass (best is the highest bet so far, 0 if none).
+#  The other players use default_bet. A bet is a multiple of step between minimum and 100 and is
+#  higher than the previous ones. If every player passes, the last one takes the minimum.
+class bet_rule:
+
+    def __init__(self, minimum=50, step=5, first=0):
+        self.minimum = minimum
+        self.step = step
+        self.first = first
+
+    def start(self, state, strategies):
+        best, declarer, atout = 0, None, 0
+        for k in range(4):
+            i = (self.first + k) % 4
+            if hasattr(strategies[i], "bid"):
+                bid = strategies[i].bid(state.hands[i], best)
+            else:
+                bid = default_bet(state.hands[i], best, self.minimum, self.step)
+            if bid is not None:
+                points, suit = bid
+                if points < max(self.minimum, best + self.step) or points > 100 or points % self.step or suit not in suits:
+                    raise Exception("Player made an invalid bet", i, bid)
+                best, declarer, atout = points, i, suit
+        if declarer is None:
+            declarer = (self.first + 3) % 4
+            best, atout = self.minimum, default_bid(state.hands[declarer])[1]
+        state.bet = (declarer, best)
+        state.atout = atout
+        state.leader = declarer
+
+    def led(self, state):
+        pass
+
+    def visible_atout(self, state):
+        return state.atout
+
+    # Tells if the team of the declarer made the points of its bet
+    def made(self, state):
+        declarer, points = state.bet
+        team = declarer % 2
+        return state.scores[team] + state.scores[team + 2] >= points
+
+# The rules that can be played, by name
+rules = {
+    "first led": first_led_rule,
+    "no atout": no_atout_rule,
+    "bet": bet_rule,
+}
+
+# Plays games between strategies with a rule
+#  With validate, the cards of the strategies are checked (a strategy that plays a card it cannot
+#  play raises an exception). The simulations between trusted strategies can skip the checks.
+#  Only the strategies that observe the played cards (observes is True, the default) are told
+#  about them at the end of each round.
+class game_engine:
+
+    def __init__(self, strategies, rule=None, validate=True, verbose=False, log=None):
+        self.strategies = strategies
+        self.rule = rule if rule is not None else first_led_rule()
+        self.validate = validate
+        self.verbose = verbose
+        self.log = log # If it is a list, the winner and the table of each round are appended to it
+        self.observers = [(j, s) for j, s in enumerate(strategies) if getattr(s, "observes", True)]
+        self.state = game_state()
+
+    # Play the game of board (the hands of the players) and return the score of each player
+    def play(self, board):
+        state, strategies, rule = self.state, self.strategies, self.rule
+        state.reset(board)
+        rule.start(state, strategies)
+        hands, legal = state.hands, state.legal
+
+        if self.verbose: print_board(hands)
+
+        for i in range(10):
+            state.round = i
+            leader = state.leader
+            table = state.table = [None, None, None, None]
+            state.asked = 0
+            asked = False
+            legal[leader] = hands[leader]
+
+            for j in range(4):
+                current = (j + leader) % 4
+                card = strategies[current].play_card(hands[current], legal[current], asked, rule.visible_atout(state), leader, table, current)
+
+                if self.validate and (not isinstance(card, int) or not 0 <= card < 40 or not legal[current] >> card & 1):
+                    print("Player", current+1, "cheated")
+                    raise Exception("Player cheated", card)
+
+                hands[current] &= ~(1 << card)
+                table[current] = card
+
+                if self.verbose: print("Player", current+1, ":", one_hot[card])
+
+                if j == 0:
+                    # The asked suit is known: legal cards of the other players
+                    asked = state.asked = suit_of[card]
+                    rule.led(state)
+                    for k in range(4):
+                        legal[k] = hands[k] & asked or hands[k]
+
+            # Update the winner and the score
+            winner, points = trick_result(table, asked, state.atout)
+            state.scores[winner] += points
+            state.leader = winner
+            if self.log is not None: self.log.append([winner, table[:]])
+            for j, s in self.observers:
+                s.update_played(table, asked, j)
+            if self.verbose: print_round(i+1, winner, table)
+
+        return state.scores
+
+
+# ==== GAME SIMULATION IMPLEMENTATION ====
+
+# Play a game
+#  If log is a list, the winner and the table of each round are appended to it
+#  deal is the deck to play (a new random deck if None) and rng the random generator that
+#  shuffles it. seat_shift gives the hands of the deal to other seats, to replay a deal with
+#  the seats swapped. rule is the rule of the atout (see GAME ENGINE) and validate checks the
+#  cards of the strategies.
+def game(verbose=True, strategies = [random_strategy(),  random_strategy(), random_strategy(), random_strategy()], log=None, deal=None, seat_shift=0, rng=random, rule=None, validate=True):
+
+    # Create a deck and attribute the cards to the players
+    deck = create_deck(rng) if deal is None else deal
+    board = attribute_cards(deck, seat_shift)
+
+    # The rounds are played by the engine (see GAME ENGINE), with the atout of the first card by default
+    return game_engine(strategies, rule, validate, verbose, log).play(board)
+
+
+
+# ==== DEALS ====
+# A deal is the shuffled deck of a game (the card i goes to the player i%4).
+#  A deal corpus is a file of deals that are played again and again, to compare strategies on the
+#  same deals. Each deal takes 40 bytes (one byte per card) and the file is memory mapped.
+
+# The deal of a game seed
+def make_deal(game_seed):
+    return create_deck(random.Random(game_seed))
+
+# Random generator of the players of the game with seed game_seed
+#  It is another stream than the one of make_deal: with the same generator, the cards the bots
+#  choose would depend on the hands they were dealt.
+def play_rng(game_seed):
+    return random.Random(f"play-{game_seed}")
+
+# Save n deals to a corpus file. The deal i is make_deal(base_seed + i)
+def save_deal_corpus(path, n, base_seed=0):
+    with open(path, "wb") as f:
+        for i in range(n):
+            f.write(bytes(make_deal(base_seed + i)))
+
+# Memory mapped deal corpus
+class deal_corpus:
+
+    def __init__(self, path):
+        self.file = open(path, "rb")
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def __len__(self):
+        return len(self.data) // 40
+
+    def __getitem__(self, i):
+        return list(self.data[40 * i:40 * (i + 1)])
+
+    def close(self):
+        self.data.close()
+        self.file.close()
@@ -0,0 +1,98 @@
+from .cards import dot, hand_to_list, popcount
+from .search import aggregators, dp_algorithm, heuristics, move_ordering, search_stats, transposition_table
+from .endgame import best_of_totals, deal_totals
+
+# ==== PARALLEL ROOT SEARCH ====
+# The cards the player can play are independent searches, and so are the deals of the endgame
+#  solver and of the sampling search. They can be sent to a pool of processes that stays alive
+#  for the whole program (one pool per number of workers). Each worker keeps its own tables from
+#  one move to the next, so they stay warm. Like in the tournament, the heuristic and the
+#  aggregator are sent by name, so only the ones of the registries can be used.
+#  The searches of the workers count their statistics and send them back with the result, the move
+#  ordering of each worker has its own tables (kept from one move to the next).
+
+root_pools = {}
+
+# Tables of the worker process (created by init_root_worker)
+worker_memo = None
+worker_cache = None
+worker_ordering = None
+
+def init_root_worker():
+    global worker_memo, worker_cache, worker_ordering
+    worker_memo = transposition_table()
+    worker_cache = {}
+    worker_ordering = move_ordering()
+
+# The pool with the given number of workers (created the first time it is asked for)
+def root_pool(workers):
+    if workers not in root_pools:
+        from concurrent.futures import ProcessPoolExecutor
+        root_pools[workers] = ProcessPoolExecutor(max_workers=workers, initializer=init_root_worker)
+    return root_pools[workers]
+
+# Stop the workers of every root pool
+def close_root_pools():
+    for pool in root_pools.values():
+        pool.shutdown()
+    root_pools.clear()
+
+# Name of a configuration in a registry (None stays None)
+def registered_name(registry, value):
+    if value is None:
+        return None
+    for name, v in registry.items():
+        if v is value:
+            return name
+    raise ValueError("Only the configurations of the registries can be sent to the workers", value)
+
+# Run by the workers: value of one card of the root (the force of the player 0 is this card only)
+#  With profile, the search_stats of the search are returned too (None without)
+def root_move_value(deck, start_player, atout, count_to_heuristic, card_per_player, force, heuristic, aggregator, prune, profile=False, ordering=False, symmetry=False):
+    stats = search_stats() if profile else None
+    value, action, _ = dp_algorithm(deck, start_player, atout, count_to_heuristic, card_per_player, force=force, heuristic=heuristics[heuristic], aggregate=aggregators[aggregator], memo=worker_memo, prune=prune, stats=stats, ordering=worker_ordering if ordering else None, symmetry=symmetry)
+    return value, action, stats
+
+# Run by the workers: deal_totals of some of the deals
+def worker_deal_totals(deals, atout, played, playable, depth, heuristic):
+    if len(worker_cache) > 1000000:
+        worker_cache.clear()
+    return deal_totals(deals, atout, played, playable, worker_cache, depth, heuristics[heuristic] if heuristic is not None else None)
+
+# dp_algorithm with each card of the root searched by a worker
+#  Same card as dp_algorithm (the first of the best cards). Returns (value, card), (0, None) if no
+#  card leads to a valid table.
+#  The statistics of the workers are merged into stats (if it is not None). ordering tells if the
+#  workers order the actions (with their own move_ordering) and symmetry is the one of dp_algorithm.
+def parallel_dp(deck, start_player, atout, count_to_heuristic, card_per_player, force, heuristic, aggregate, prune, workers, stats=None, ordering=False, symmetry=False):
+    pool = root_pool(workers)
+    names = (registered_name(heuristics, heuristic), registered_name(aggregators, aggregate))
+    cards = hand_to_list(dot(deck[0], force[0]))
+    futures = [pool.submit(root_move_value, deck, start_player, atout, count_to_heuristic, card_per_player, [1 << u] + force[1:], *names, prune, stats is not None, ordering, symmetry) for u in cards]
+
+    best = (0, None)
+    for u, future in zip(cards, futures):
+        value, action, card_stats = future.result()
+        if card_stats is not None:
+            stats.merge(card_stats)
+        # No valid table for this card
+        if action != u:
+            continue
+        if best[1] is None or value > best[0]:
+            best = (value, u)
+    return best
+
+# solve_deals with the deals split between the workers
+def parallel_solve_deals(deals, atout, played, playable, depth, heuristic, workers):
+    pool = root_pool(workers)
+    name = registered_name(heuristics, heuristic)
+    size = max(1, -(-len(deals) // (2 * workers)))
+    futures = [pool.submit(worker_deal_totals, deals[i:i + size], atout, played, playable, depth, name) for i in range(0, len(deals), size)]
+
+    totals = [0] * popcount(playable)
+    n_deals = 0
+    for future in futures:
+        chunk_totals, chunk_deals = future.result()
+        totals = [x + y for x, y in zip(totals, chunk_totals)]
+        n_deals += chunk_deals
+    return best_of_totals(playable, totals, n_deals)
@@ -0,0 +1,686 @@
+from collections import OrderedDict
+from collections import defaultdict
+import math
+import time
+import statistics
+from bisect import insort
+
+from .cards import (
+    add_cap, all_hand, dot, hand_to_list, is_array, madd, popcount, remove_card, score, suit_of, suits,
+    trick_result
+)
+
+# ==== DP ALGORITHM ====
+
+# memoization implementation
+#  The table has a maximum size. When it is full, the least recently used entry is removed,
+#  so the memory stays the same however many games are played with the same table.
+class transposition_table:
+
+    def __init__(self, max_size=200000):
+        self.max_size = max_size
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        v = self.entries.get(key)
+        if v is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return v
+
+    def set(self, key, value):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    # Best action found for a position, whatever the depth of the search
+    #  Only used to choose which action to try first
+    def get_move(self, key):
+        return self.entries.get(("move", key))
+
+    def set_move(self, key, action):
+        self.set(("move", key), action)
+
+    # Empty the table (for example between two configurations)
+    def clear(self):
+        self.entries.clear()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+# Statistics of the dp algorithm
+#  Pass a search_stats to dp_algorithm (or to dp_strategy) to count what the search does.
+#  Without it, the search only checks that stats is None.
+class search_stats:
+
+    def __init__(self):
+        self.nodes = defaultdict(int) # Positions expanded, by number of turns left before the heuristic
+        self.pigeonhole = 0 # Tables rejected because the beliefs after them are not possible (see hall_valid)
+        self.pruned = 0 # Actions dropped by the pruning
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self.heuristic_calls = 0
+        self.heuristic_time = 0
+        self.moves = 0 # Decisions of the dp strategy
+        self.move_time = 0
+        self.max_move_time = 0
+
+    # Call the heuristic and measure it
+    def heuristic(self, heuristic, deck, start_player, atout):
+        start = time.perf_counter()
+        value = heuristic(deck, start_player, atout)
+        self.heuristic_time += time.perf_counter() - start
+        self.heuristic_calls += 1
+        return value
+
+    # Call the heuristic on many positions (see evaluate_batch) and measure it
+    def heuristic_batch(self, heuristic, decks, start_players, atout):
+        start = time.perf_counter()
+        values = evaluate_batch(heuristic, decks, start_players, atout)
+        self.heuristic_time += time.perf_counter() - start
+        self.heuristic_calls += len(decks)
+        return values
+
+    def add_move(self, duration):
+        self.moves += 1
+        self.move_time += duration
+        self.max_move_time = max(self.max_move_time, duration)
+
+    # Add the statistics of another collector (for example from another process)
+    def merge(self, other):
+        for depth, n in other.nodes.items():
+            self.nodes[depth] += n
+        self.pigeonhole += other.pigeonhole
+        self.pruned += other.pruned
+        self.memo_hits += other.memo_hits
+        self.memo_misses += other.memo_misses
+        self.heuristic_calls += other.heuristic_calls
+        self.heuristic_time += other.heuristic_time
+        self.moves += other.moves
+        self.move_time += other.move_time
+        self.max_move_time = max(self.max_move_time, other.max_move_time)
+
+    def summary(self):
+        nodes = ", ".join(f"d{d}={n}" for d, n in sorted(self.nodes.items(), reverse=True))
+        lookups = self.memo_hits + self.memo_misses
+        return (f"moves={self.moves} time/move={1000 * self.move_time / max(self.moves, 1):.2f}ms "
+                f"max={1000 * self.max_move_time:.2f}ms nodes={sum(self.nodes.values())} ({nodes}) "
+                f"pigeonhole={self.pigeonhole} pruned={self.pruned} "
+                f"memo={self.memo_hits}/{lookups} ({100 * self.memo_hits / max(lookups, 1):.1f}%) "
+                f"heuristic={self.heuristic_calls} ({1000 * self.heuristic_time:.2f}ms)")
+
+# Raised by search_budget when the budget of a search is spent
+class search_timeout(Exception):
+    pass
+
+# Budget of a search, in seconds and in positions (no limit if None)
+class search_budget:
+
+    def __init__(self, time_budget=None, node_budget=None):
+        self.deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        self.node_budget = node_budget
+        self.nodes = 0
+
+    # Called for every position expanded by the search
+    def tick(self):
+        self.nodes += 1
+        if self.node_budget is not None and self.nodes > self.node_budget:
+            raise search_timeout()
+        self.check()
+
+    # Called while a position is expanded (a position with many cards left takes a while)
+    def check(self):
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise search_timeout()
+
+# Order in which dp_algorithm tries the actions
+#  The actions that are likely to be the best are tried first, so that the pruning drops more of
+#  the others: the best action of a previous search of the position (hash move), then the actions
+#  that stopped a search early at the same depth (killer moves), then the actions that were often
+#  the best (history), then the atout and the strongest cards.
+#  The tables are kept from one move to the next, clear them for a new game.
+class move_ordering:
+
+    def __init__(self):
+        self.history = [0] * 40
+        self.killers = defaultdict(list) # The last 2 killer moves, by number of turns left before the heuristic
+
+    def clear(self):
+        self.history = [0] * 40
+        self.killers.clear()
+
+    # The cards in the order to try them
+    def sort(self, cards, atout, depth, hash_move=None):
+        killers = self.killers[depth]
+        return sorted(cards, key=lambda c: (c != hash_move, c not in killers, -self.history[c], not atout >> c & 1, c % 10))
+
+    # The card made the search stop early
+    def cutoff(self, card, depth):
+        killers = self.killers[depth]
+        if card not in killers:
+            killers.insert(0, card)
+            del killers[2:]
+        self.history[card] += depth * depth
+
+    # The card was the best action of a position
+    def best(self, card, depth):
+        self.history[card] += depth * depth
+
+# SUIT SYMMETRIES
+#  The atouts beat the asked suit, and the other suits never win a round (see trick_result). So the
+#  suits that are not the atout can be swapped: the winner of every round stays the same card, up to
+#  the swap. The positions that differ only by such a swap have the same value, if the heuristic does
+#  not look at the suits either (suit_symmetric attribute). Without atout (0), the four suits can be
+#  swapped. Before the atout is chosen (all_hand), the smallest index wins, so no suits can be swapped.
+
+# The groups of suits that can be swapped, by atout
+symmetric_suits = {atout: [[s for s in range(4) if s != t]] for t, atout in enumerate(suits)}
+symmetric_suits[0] = [[0, 1, 2, 3]]
+
+# The card c once the suits are moved by perm (the suit s goes to perm[s])
+def permute_card(c, perm):
+    return perm[c // 10] * 10 + c % 10
+
+# Canonical form of a position under the suit swaps
+#  boards are the hands of the position (the deck and the force of dp_algorithm). In each group of
+#  suits that can be swapped, the suits are sorted by their cards in every board.
+#  Returns the boards of the canonical position, the permutation that gives it (perm[s] is where
+#  the suit s goes) and the inverse permutation, and the suits that are a copy of a previous suit
+#  of their group (as a hand): the actions in these suits are worth the same as in the previous one.
+def canonical_position(boards, atout):
+    perm = [0, 1, 2, 3]
+    copies = 0
+    for group in symmetric_suits[atout]:
+        signature = {s: tuple(b >> (10 * s) & 0x3ff for b in boards) for s in group}
+        for slot, s in zip(group, sorted(group, key=lambda s: signature[s])):
+            perm[s] = slot
+        for k, s in enumerate(group):
+            if any(signature[s] == signature[r] for r in group[:k]):
+                copies |= suits[s]
+    inverse = [0] * 4
+    for s in range(4):
+        inverse[perm[s]] = s
+    if perm != [0, 1, 2, 3]:
+        boards = [sum((b >> (10 * s) & 0x3ff) << (10 * perm[s]) for s in range(4)) for b in boards]
+    return boards, perm, inverse, copies
+
+# The key of the memoization contains everything that changes the result of dp_algorithm
+#  The heuristic and the aggregator are part of the key, so two configurations can share a table
+def memo_key(deck, start_player, atout, count_to_heuristic, card_per_player, force, heuristic, aggregate):
+    return (*deck, start_player, atout, count_to_heuristic, card_per_player, *force, heuristic, aggregate)
+
+
+# Helper function for DP algorithm
+def iter_without(card, deck, n):
+    return hand_to_list(remove_card(deck[n], card))
+
+# FEASIBILITY OF THE BELIEFS
+#  The other players hold exactly the cards that are not in the hand of the player 0 and that were
+#  not played, n cards each. A deck of beliefs is possible if and only if these cards can be given
+#  to players that may have them, n cards each. By Hall's theorem, it is the case when there are
+#  3n such cards and every set of other players may have at least n cards per player between them.
+#  (The previous check, pignonier_valid, only looked at 3 of the 7 sets and allowed one card less
+#  per player.)
+
+# Sizes of the sets of other players, in the order of subset_unions
+subset_sizes = [1, 1, 1, 2, 2, 2, 3]
+
+# Cards that each set of other players may have
+def subset_unions(deck):
+    d1, d2, d3 = deck[1], deck[2], deck[3]
+    return [d1, d2, d3, d1 | d2, d1 | d3, d2 | d3, d1 | d2 | d3]
+
+# Tells if the players can have n cards each with the deck of beliefs
+def hall_valid(deck, n):
+    counts = [popcount(u) for u in subset_unions(deck)]
+    if popcount(deck[0]) != n or counts[6] != 3 * n:
+        return False
+    return all(c >= n * size for c, size in zip(counts, subset_sizes))
+
+# AGREGATORS
+
+def utility(v):
+    if v < 0:
+        return v * 2
+    else:
+        return v
+
+def min_utility(values):
+    return min(map(utility, values))
+
+def gen_cutoff_agregator(cutoff):
+
+    def cutoff_aggregator(lst):
+        sorted_lst = sorted(lst)
+        index = int(len(lst) * cutoff)
+        return sorted_lst[index]
+
+    cutoff_aggregator.cutoff = cutoff
+    return cutoff_aggregator
+
+# Tells how the dp algorithm can prune the possibilities of an aggregator
+#  None means that the aggregator is unknown and nothing is pruned
+def pruning_kind(aggregate):
+    if aggregate is min:
+        return "min"
+    if aggregate is min_utility:
+        return "min_utility"
+    if aggregate is statistics.mean:
+        return "mean"
+    if hasattr(aggregate, "cutoff"):
+        return "cutoff"
+    return None
+
+# HEURISTIQUES
+#  A heuristic takes (deck, start_player, atout) and returns the value of the position for the player 0.
+#  The bound attribute is the highest value the heuristic can return. The pruning of the
+#  mean aggregator needs it (there are 100 points in the game)
+#  The suit_symmetric attribute tells that the value does not change when suits are swapped
+#  (see SUIT SYMMETRIES)
+#  The batch attribute evaluates many positions in one call: batch(decks, start_players, atout)
+#  returns the values of the positions. decks is a list of decks or, with numpy, an N x 4 x 40
+#  boolean array (like the hands of the batch simulation, see np_decks). Call evaluate_batch,
+#  it also works with the heuristics that have no batch attribute.
+def hand_heuristic(deck, start_player, atout):
+    return score(deck[0])
+
+def hand_heuristic_batch(decks, start_players, atout):
+    if is_array(decks):
+        from .batch import np_points
+        return decks[:, 0, :] @ np_points
+    return [score(deck[0]) for deck in decks]
+
+hand_heuristic.bound = 100
+hand_heuristic.batch = hand_heuristic_batch
+hand_heuristic.suit_symmetric = True
+
+def gen_future_heuristic(ratio):
+    def future_heuristic(deck, start_player, atout):
+        return score(deck[0] | deck[1] | deck[2] | deck[3]) * ratio
+
+    def future_heuristic_batch(decks, start_players, atout):
+        if is_array(decks):
+            from .batch import np_points
+            return (decks.any(axis=1) @ np_points) * ratio
+        return [score(deck[0] | deck[1] | deck[2] | deck[3]) * ratio for deck in decks]
+    
+    future_heuristic.bound = 100 * ratio
+    future_heuristic.batch = future_heuristic_batch
+    future_heuristic.suit_symmetric = True
+    return future_heuristic
+
+# Points of a suit for best_card_win_heuristique, by the 10 cards of the suit that are in the game
+#  (5 if the first card is there, 10 for the 6th card and 10 for the last one)
+best_card_suit_points = [5 * (s & 1) + 10 * (s >> 5 & 1) + 10 * (s >> 9 & 1) for s in range(1 << 10)]
+
+def best_card_win_heuristique(H, start_player, atout):
+    # Every card in the game
+    present = H[0] | H[1] | H[2] | H[3]
+
+    us_point = 0
+    them_point = 0
+    i = 0
+    while True:
+        # Next card in the game, from the card i
+        rest = present >> i
+        if not rest:
+            break
+        i += (rest & -rest).bit_length() - 1
+        suit_points = best_card_suit_points[present >> (i - i % 10) & 0x3ff]
+
+        #we have the strongest card of the suit
+        if H[0] >> i & 1:
+            us_point += suit_points
+
+        #somebody else has it
+        else:
+            n = (H[1] >> i & 1) + (H[2] >> i & 1) + (H[3] >> i & 1) #nubmer of player "sharing" the card
+
+            # teamate has it
+            if H[2] >> i & 1:
+                us_point   = 1/n * suit_points
+                them_point = (1-(1/n)) * suit_points
+
+            # ennemy has it
+            else:
+                them_point = suit_points
+
+        #we saw a best card, go to next suit (10 cards further, not the first card of the next suit)
+        i += 10
+    return us_point - them_point
+
+def best_card_win_batch(decks, start_players, atout):
+    if not is_array(decks):
+        return [best_card_win_heuristique(deck, s, atout) for deck, s in zip(decks, start_players)]
+
+    import numpy as np
+
+    n_games = len(decks)
+    rows = np.arange(n_games)
+    present = decks.any(axis=1)
+    us_point = np.zeros(n_games)
+    them_point = np.zeros(n_games)
+    i = np.zeros(n_games, dtype=int)
+    # There are at most 4 cards on the walk (each one is 10 cards after the previous one)
+    for _ in range(4):
+        candidates = present & (np.arange(40)[None, :] >= i[:, None])
+        active = candidates.any(axis=1)
+        i = np.where(active, candidates.argmax(axis=1), 40)
+        card = np.minimum(i, 39)
+        base = card - card % 10
+        suit_points = 5 * present[rows, base] + 10 * present[rows, base + 5] + 10 * present[rows, base + 9]
+        owners = decks[rows, :, card]
+        n = owners[:, 1:].sum(axis=1)
+        ours = active & owners[:, 0]
+        mate = active & ~owners[:, 0] & owners[:, 2]
+        them = active & ~owners[:, 0] & ~owners[:, 2]
+        us_point = np.where(ours, us_point + suit_points, us_point)
+        us_point = np.where(mate, 1 / np.maximum(n, 1) * suit_points, us_point)
+        them_point = np.where(mate, (1 - (1 / np.maximum(n, 1))) * suit_points, them_point)
+        them_point = np.where(them, suit_points, them_point)
+        i = i + 10
+    return us_point - them_point
+
+best_card_win_heuristique.bound = 100
+best_card_win_heuristique.batch = best_card_win_batch
+best_card_win_heuristique.suit_symmetric = False # The walk over the cards depends on the suits
+
+# Values of a heuristic on many positions (see HEURISTIQUES)
+def evaluate_batch(heuristic, decks, start_players, atout):
+    batch = getattr(heuristic, "batch", None)
+    if batch is not None:
+        return batch(decks, start_players, atout)
+    return [heuristic(deck, s, atout) for deck, s in zip(decks, start_players)]
+
+
+# The configurations that can be tested, by name
+#  Workers receive the names only, so a configuration can be sent to another process
+heuristics = {
+    "future (0.4)": gen_future_heuristic(0.4),
+    "future (0.6)": gen_future_heuristic(0.6),
+    "best_card_win": best_card_win_heuristique,
+    "hand point": hand_heuristic,
+}
+
+aggregators = {
+    "mean + utility": min_utility,
+    "cutoff 25%": gen_cutoff_agregator(.25),
+    "mean": statistics.mean,
+    "min": min,
+    "cutoff 45%": gen_cutoff_agregator(.45),
+}
+
+
+# Number of leaves evaluated between two checks of the budget
+leaf_chunk = 256
+
+# The dp algorithm
+def dp_algorithm(
+    deck,                                # The current deck. deck[0] is the hand of the player that is playing 
+    start_player,                        # The player that plays first
+    atout,                               # The atout as a hand
+    count_to_heuristic,                  # The number of turns to look in the future before running the heuristic
+    card_per_player,                     # The number of cards per player
+    force=[all_hand] * 4,                # The cards that have been played this round 
+    heuristic=gen_future_heuristic(0.4), # The heuristic to use
+    aggregate=statistics.mean,           # The aggregator to use
+    memo=None,                           # The transposition table (no memoization if None)
+    prune=False,                         # Skip the possibilities that cannot change the chosen card
+    alpha=-math.inf,                     # When pruning, the caller does not need values <= alpha
+    beta=math.inf,                       #  or values >= beta
+    stats=None,                          # The search_stats to update (no statistics if None)
+    budget=None,                         # The search_budget (raises search_timeout when spent)
+    order=False,                         # Try first the best action found by a previous search
+    ordering=None,                       # The move_ordering of the actions and of the replies (None to keep the card order)
+    symmetry=False                       # Use the suit symmetries (only with a suit_symmetric heuristic)
+    ):
+
+    
+    if count_to_heuristic == 0:
+        # Our base case is the heuristic
+        if stats is not None:
+            return (stats.heuristic(heuristic, deck, start_player, atout), [], [])
+        return (heuristic(deck, start_player, atout), [], [])
+
+    # The positions that are the same up to a swap of suits share their memoization
+    perm = None
+    if symmetry and atout in symmetric_suits and getattr(heuristic, "suit_symmetric", False):
+        boards, perm, inverse, copies = canonical_position([*deck, *force], atout)
+
+    # Check for memoization
+    if memo is not None:
+        if perm is not None:
+            key = memo_key(boards[:4], start_player, atout, count_to_heuristic, card_per_player, boards[4:], heuristic, aggregate)
+        else:
+            key = memo_key(deck, start_player, atout, count_to_heuristic, card_per_player, force, heuristic, aggregate)
+        v = memo.get(key)
+        if stats is not None:
+            if v: stats.memo_hits += 1
+            else: stats.memo_misses += 1
+        if v: 
+            if perm is not None:
+                # The action is stored for the canonical position
+                return (v[0], permute_card(v[1], inverse), v[2])
+            return v
+
+    if stats is not None:
+        stats.nodes[count_to_heuristic] += 1
+    if budget is not None:
+        budget.tick()
+
+    # The cards to iterate over
+    iter_deck = [dot(deck[i], force[i]) for i in range(4)]
+
+    # The deck as a list of cards
+    ddeck = list(map(hand_to_list, iter_deck))
+
+    # An action in a suit that is a copy of another suit is worth the same as in the other suit
+    if perm is not None and copies:
+        ddeck[0] = [u for u in ddeck[0] if not copies >> u & 1]
+
+    # The best action of a previous search is tried first (the order changes which action is taken
+    # only when several actions have the same value)
+    keep_move = (order or ordering is not None) and memo is not None
+    if keep_move:
+        move_key = (*deck, start_player, atout, *force)
+        hash_move = memo.get_move(move_key)
+        if ordering is not None:
+            ddeck[0] = ordering.sort(ddeck[0], atout, count_to_heuristic, hash_move)
+        elif hash_move in ddeck[0]:
+            ddeck[0].remove(hash_move)
+            ddeck[0].insert(0, hash_move)
+    elif ordering is not None:
+        ddeck[0] = ordering.sort(ddeck[0], atout, count_to_heuristic)
+
+    # Pruning: an action is dropped as soon as an upper bound of its aggregated value is not better
+    #  than the best action so far (the first best action is the one taken, so ties are dropped too).
+    #  With min, it is an alpha-beta search. With the mean and the cutoffs, the bound uses the
+    #  highest value a possibility can take.
+    kind = pruning_kind(aggregate) if prune else None
+    if kind == "mean":
+        bound = getattr(heuristic, "bound", None)
+        if bound is None:
+            kind = None
+        else:
+            high = score(madd(*deck)) + bound
+
+    # Feasibility of the beliefs after the round (see hall_valid). The cards of the table are
+    #  removed one by one from the counts of each set of other players.
+    unions = subset_unions(deck)
+    counts = [popcount(union) for union in unions]
+    n_next = card_per_player - 1
+    needs = [n_next * size for size in subset_sizes]
+
+    U = [] # Set of possible actions
+    best = -math.inf # Value of the best action
+    cut_value = -math.inf # Highest bound of the actions that were pruned
+    for u in ddeck[0]:
+        branches = [] # All valid tables for the current action
+
+        played_u = 1 << u
+        for p2 in iter_without(played_u, iter_deck, 1):
+            if budget is not None:
+                budget.check()
+            played_2 = played_u | 1 << p2
+            counts_2 = [c - (union >> p2 & 1) for c, union in zip(counts, unions)]
+            for p3 in iter_without(played_2, iter_deck, 2):
+                if budget is not None:
+                    budget.check()
+                played_3 = played_2 | 1 << p3
+                counts_3 = [c - (union >> p3 & 1) for c, union in zip(counts_2, unions)]
+                last_cards = remove_card(iter_deck[3], played_3)
+
+                # The last card is one of the cards left, so one card less is left after it
+                if counts_3[6] - 1 != 3 * n_next or any(c < need for c, need in zip(counts_3, needs)):
+                    if stats is not None: stats.pigeonhole += popcount(last_cards)
+                    continue
+                # The sets of players that have no card to spare: the last card cannot be one of theirs
+                forbidden = 0
+                for c, need, union in zip(counts_3, needs, unions):
+                    if c == need:
+                        forbidden |= union
+                valid_cards = remove_card(last_cards, forbidden)
+                if stats is not None: stats.pigeonhole += popcount(last_cards) - popcount(valid_cards)
+
+                for p4 in hand_to_list(valid_cards):
+
+                    # Current table of cards to test
+                    table = [u, p2, p3, p4]
+                    hand_table = played_3 | 1 << p4
+
+                    # Create the next deck with the next beleif
+                    asked = suit_of[table[start_player]]
+                    next_deck = [0] * 4
+                    for i in range(1, 4):
+                        fournis = asked >> table[i] & 1 # S'il a fournit la couleur demandé
+                        fournis = True
+                        if not fournis:
+                            next_deck[i] = remove_card(deck[i], add_cap(hand_table, asked))
+                        else:
+                            next_deck[i] = remove_card(deck[i], hand_table)
+
+                    next_deck[0] = remove_card(deck[0], hand_table)
+
+                    # Calculate the score of the current round
+                    winner, s = trick_result(table, asked, atout)
+                    current_score = s if winner%2 == 0 else -s
+                    branches.append((current_score, next_deck, winner))
+
+        # When the next turns are leaves, their heuristics are evaluated in one call (in chunks of
+        #  leaf_chunk positions with a budget, so that the budget is checked between them)
+        leaves = None
+        if count_to_heuristic == 1 and card_per_player-1 != 1:
+            decks = [next_deck for _, next_deck, _ in branches]
+            starts = [winner for _, _, winner in branches]
+            size = len(decks) if budget is None else leaf_chunk
+            leaves = []
+            for i in range(0, len(decks), max(size, 1)):
+                if budget is not None:
+                    budget.check()
+                if stats is not None:
+                    leaves.extend(stats.heuristic_batch(heuristic, decks[i:i + size], starts[i:i + size], atout))
+                else:
+                    leaves.extend(evaluate_batch(heuristic, decks[i:i + size], starts[i:i + size], atout))
+
+        # The worst tables for the player are looked at first, the upper bound of the action goes down faster
+        if ordering is not None and kind is not None:
+            if leaves is not None:
+                worst = sorted(range(len(branches)), key=lambda k: branches[k][0] + leaves[k])
+                branches = [branches[k] for k in worst]
+                leaves = [leaves[k] for k in worst]
+            else:
+                branches.sort(key=lambda b: b[0])
+
+        possibilities = [] # All possibilities for the current action
+        threshold = max(alpha, best)
+        upper = math.inf # Upper bound of the aggregated value
+        total = 0
+        seen = []
+        for k, (current_score, next_deck, winner) in enumerate(branches):
+            if budget is not None and k % leaf_chunk == 0:
+                budget.check()
+            # Call the dp algorithm recursively
+            if card_per_player-1 == 1:
+                possibilities.append(current_score)
+            elif leaves is not None:
+                possibilities.append(current_score + leaves[k])
+            else:
+                # With min, the next turn only matters between the threshold and the current minimum
+                child_alpha, child_beta = -math.inf, math.inf
+                if kind == "min":
+                    child_alpha, child_beta = threshold - current_score, upper - current_score
+                (future_score, action, future_table) = dp_algorithm(next_deck, winner, atout, count_to_heuristic - 1, card_per_player-1, heuristic=heuristic, aggregate=aggregate, memo=memo, prune=prune, alpha=child_alpha, beta=child_beta, stats=stats, budget=budget, order=order, ordering=ordering, symmetry=symmetry)
+                possibilities.append(current_score + future_score)
+
+            if kind is None:
+                continue
+            value = possibilities[-1]
+            if kind == "min":
+                upper = min(upper, value)
+            elif kind == "min_utility":
+                upper = min(upper, utility(value))
+            elif kind == "mean":
+                total += value
+                upper = (total + (len(branches) - len(possibilities)) * high) / len(branches)
+            else:
+                # The k-th smallest of all the values is at most the k-th smallest of the values seen
+                insort(seen, value)
+                index = int(len(branches) * aggregate.cutoff)
+                if len(seen) > index:
+                    upper = seen[index]
+            if upper <= threshold:
+                break
+
+        if kind is not None and upper <= threshold:
+            cut_value = max(cut_value, upper)
+            if stats is not None: stats.pruned += 1
+            continue
+
+        # Aggregate the possibilities
+        if possibilities != []:
+            U.append((aggregate(possibilities), u, []))
+            best = max(best, U[-1][0])
+            if best >= beta:
+                # The caller will not use this turn, no need to look at the other actions
+                if stats is not None: stats.pruned += 1
+                action_to_take = max(U, key=lambda x: x[0])
+                if keep_move:
+                    memo.set_move(move_key, action_to_take[1])
+                if ordering is not None:
+                    ordering.cutoff(u, count_to_heuristic)
+                return action_to_take
+
+    # This can happend if we enter an invalid state
+    if U == []:
+        if cut_value > -math.inf:
+            return (cut_value, ["PRUNED"], [])
+        return (0, ["INVALID"], [])
+
+    # The action to take is the maximum of all possible actions
+    action_to_take = max(U, key=lambda x: x[0])
+    if action_to_take[0] <= alpha:
+        # Some pruned action might be better, the value is only a bound
+        return (max(action_to_take[0], cut_value), action_to_take[1], [])
+
+    if ordering is not None:
+        ordering.best(action_to_take[1], count_to_heuristic)
+
+    # Set memoization before returning
+    if memo is not None:
+        if perm is not None:
+            memo.set(key, (action_to_take[0], permute_card(action_to_take[1], perm), action_to_take[2]))
+        else:
+            memo.set(key, action_to_take)
+        if keep_move:
+            memo.set_move(move_key, action_to_take[1])
+    return action_to_take
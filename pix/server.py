@@ -0,0 +1,171 @@
+import sys
+import os
+import random
+
+from .cards import (
+    card_index, clubs, diamonds, hearts, hand_to_list, make_hand, one_hot, playable_cards,
+    remove_card, spades, suit_of, suits
+)
+from .strategies import dp_strategy
+from .search import aggregators, heuristics
+from .engine import default_bet
+from .book import opening_book
+
+# ==== BOT SERVER ====
+# A long running bot that an arbiter drives with one line per message (python -m pix serve)
+#  The process, the tables and the transposition table of the dp strategy are kept from one hand
+#  to the next, so thousands of hands pay for the start of Python only once. Cards are written
+#  like one_hot ("10H"), suits with their letter (H, D, C, S) and the players are the seats 0 to 3.
+#  Messages of the arbiter and answers of the bot:
+#   new <seat> <10 cards>        A new hand starts, we are the player seat          -> ok
+#   atout <suit>                 The atout of the hand, none for a hand without atout
+#                                (without it, the atout is the suit of the first
+#                                card of the hand)                                  -> ok
+#   bid <best>                   Our bet, best is the highest bet so far (0 if none) -> bid <points> <suit> or pass
+#   play <leader> <cards>        Our card, leader started the round and the cards
+#                                are the ones already played, from the leader       -> card <card>
+#   round <leader> <4 cards>     End of a round, the cards from the leader           -> ok
+#   quit                         Stop the bot                                       -> bye
+#  A message that cannot be understood is answered with "error <reason>", the bot keeps running.
+
+suit_names = {"H": hearts, "D": diamonds, "C": clubs, "S": spades}
+
+# The state of the hand played by the bot
+class bot_session:
+
+    def __init__(self, strategy):
+        self.strategy = strategy
+        self.seat = 0
+        self.hand = 0
+        self.atout = False # False until the atout is known (0 for no atout)
+        self.fixed_atout = False # The atout was given by the arbiter
+        self.played = None # The card we played in the current round (None if we did not play yet)
+
+    def new_hand(self, seat, cards):
+        if not 0 <= seat < 4 or len(cards) != 10 or len(set(cards)) != 10:
+            raise ValueError("a hand is a seat and 10 different cards")
+        self.seat = seat
+        self.hand = make_hand(*cards)
+        self.atout = False
+        self.fixed_atout = False
+        self.played = None
+        # The dp strategy starts a new game at its 10th turn
+        self.strategy.current_turn = 10
+
+    def set_atout(self, suit):
+        self.atout = suit
+        self.fixed_atout = True
+
+    # The table of the round, by seat
+    def table(self, leader, cards):
+        table = [None, None, None, None]
+        for k, c in enumerate(cards):
+            table[(leader + k) % 4] = c
+        return table
+
+    # The card the strategy plays. A card that the strategy cannot play (the searches return None or
+    #  a string for the positions they do not value) is replaced by a random playable card.
+    def play(self, leader, cards):
+        if (leader + len(cards)) % 4 != self.seat or len(cards) > 3:
+            raise ValueError("it is not our turn")
+        if self.played is not None or not self.hand:
+            raise ValueError("we already played this round")
+        if len(set(cards)) != len(cards) or make_hand(*cards) & self.hand:
+            raise ValueError("the cards of the table are not the cards of the others")
+        asked = suit_of[cards[0]] if cards else False
+        atout = self.atout if self.atout is not False or not asked else asked
+        playable = playable_cards(self.hand, asked)
+        card = self.strategy.play_card(self.hand, playable, asked, atout, leader, self.table(leader, cards), self.seat)
+        if not isinstance(card, int) or not 0 <= card < 40 or not playable >> card & 1:
+            card = getattr(self.strategy, "rng", random).choice(hand_to_list(playable))
+        self.hand = remove_card(self.hand, 1 << card)
+        self.played = card
+        return card
+
+    # The round must have the card we played, at our seat, and none of the cards we still have
+    def end_round(self, leader, cards):
+        if not 0 <= leader < 4 or len(cards) != 4 or len(set(cards)) != 4:
+            raise ValueError("a round has 4 different cards")
+        table = self.table(leader, cards)
+        if self.played is None or table[self.seat] != self.played:
+            raise ValueError("the round does not have the card we played")
+        if make_hand(*cards) & self.hand:
+            raise ValueError("the round has cards of our hand")
+        asked = suit_of[cards[0]]
+        if self.atout is False:
+            self.atout = asked
+        self.played = None
+        self.strategy.update_played(table, asked, self.seat)
+
+    def bid(self, best):
+        if hasattr(self.strategy, "bid"):
+            return self.strategy.bid(self.hand, best)
+        return default_bet(self.hand, best)
+
+# Answer one message of the arbiter (None to stop)
+def bot_answer(session, line):
+    words = line.split()
+    if not words:
+        return "error empty message"
+    try:
+        command, args = words[0], words[1:]
+        if command == "new":
+            session.new_hand(int(args[0]), [card_index[c] for c in args[1:]])
+            return "ok"
+        if command == "atout":
+            session.set_atout(0 if args[0] == "none" else suit_names[args[0]])
+            return "ok"
+        if command == "bid":
+            bid = session.bid(int(args[0]))
+            if bid is None:
+                return "pass"
+            points, suit = bid
+            return f"bid {points} {'HDCS'[suits.index(suit)]}"
+        if command == "play":
+            return "card " + one_hot[session.play(int(args[0]), [card_index[c] for c in args[1:]])]
+        if command == "round":
+            session.end_round(int(args[0]), [card_index[c] for c in args[1:]])
+            return "ok"
+        if command == "quit":
+            return None
+        return "error unknown message " + command
+    except Exception as e: # The bot keeps running, whatever the message
+        return f"error {type(e).__name__} {e}"
+
+# The strategy of the bot
+#  latency is the time to answer a move (in seconds). The search of a move gets the half of it:
+#  the search can go over its budget a bit, and the answer must not be late. The endgame solver has
+#  no budget, it only plays the last 2 rounds (3 rounds can take a second).
+#  book is the path of an opening book, that plays the first round instead of the search.
+def bot_strategy(latency=0.2, heuristic="future (0.4)", aggregator="mean", book=None):
+    opening = opening_book(book) if book is not None else None
+    return dp_strategy(10, heuristics[heuristic], aggregators[aggregator], prune=True, time_budget=latency / 2, endgame=2, ordering=True, book=opening)
+
+# Answer the messages of infile on outfile until quit (or the end of infile)
+def serve(infile=sys.stdin, outfile=sys.stdout, strategy=None):
+    session = bot_session(strategy if strategy is not None else bot_strategy())
+    for line in infile:
+        answer = bot_answer(session, line)
+        outfile.write((answer if answer is not None else "bye") + "\n")
+        outfile.flush()
+        if answer is None:
+            return True
+    return False
+
+# Same as serve, on a unix socket
+#  The arbiter connects to path, the connections are served one after the other with the same
+#  strategy (and the same transposition table) until a connection sends quit.
+def serve_socket(path, strategy=None):
+    import socket
+    strategy = strategy if strategy is not None else bot_strategy()
+    if os.path.exists(path):
+        os.remove(path)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as server:
+        server.bind(path)
+        server.listen(1)
+        while True:
+            connection, _ = server.accept()
+            with connection, connection.makefile("r") as infile, connection.makefile("w") as outfile:
+                if serve(infile, outfile, strategy):
+                    break
+    os.remove(path)
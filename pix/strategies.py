@@ -0,0 +1,261 @@
+import random
+import time
+
+from .cards import (
+    add_cap, all_hand, dot, first, get_highest_any_suite, hand_to_list, mask_atout, popcount,
+    remove_card
+)
+from .search import (
+    aggregators, dp_algorithm, heuristics, move_ordering, search_budget, search_timeout, transposition_table
+)
+from .endgame import endgame_solver, sampling_search
+from .parallel import parallel_dp, registered_name
+
+# ==== STRATEGIES ====
+
+# Strategy that plays a random card among the ones that it has
+#  rng is the random generator to use (the global one by default)
+class random_strategy:
+    observes = False # Does not use the played cards
+
+    def __init__(self, rng=random):
+        self.rng = rng
+
+    def play_card(self, hand, playable_hand, asked, atout, a, b, c):
+        return self.rng.choice(hand_to_list(playable_hand))
+
+    def update_played(self, played, asked, a):
+        pass
+
+# Strategy that plays the highest card of any suite
+class highest_strategy:
+    observes = False # Does not use the played cards
+
+    def __init__(self, rng=random):
+        self.rng = rng
+
+    def play_card(self, hand, playable_hand, asked, atout, a, b, c):
+        if atout is False: # first to play (in the game)
+            return get_highest_any_suite(playable_hand)
+
+        if not asked: # first to play
+            atout_masked = dot(atout, playable_hand)
+            if atout_masked:
+                return first(atout_masked)
+            else:
+                return get_highest_any_suite(playable_hand)
+
+        masked = mask_atout(playable_hand, asked, atout)
+        index = first(masked)
+        if index != -1:
+            return index
+        else:
+            return random_strategy(self.rng).play_card(hand, playable_hand, asked, atout, a, b, c)
+
+    def update_played(self, played, asked, a):
+        pass
+
+
+# What a player knows about the hands of the others
+#  Players are counted from the player that owns the beliefs (0 is him, 1 the next one, ...).
+#  hands[i] are the cards the player i may have (his own hand for the player 0). Like the README
+#  says, a card the player 0 does not have is shared between the players that may have it: each one
+#  has it with the same probability (33% at the start). When a player does not follow the asked
+#  suit, he has no card of this suit left. The beliefs are updated card by card.
+class belief_state:
+
+    def __init__(self, hand):
+        others = remove_card(all_hand, hand)
+        self.hands = [hand, others, others, others]
+        self.voids = [0] * 4 # Suits that each player does not have anymore (as a hand)
+        # probs[(i-1)*40 + c]: probability that the player i (1 to 3) has the card c
+        self.probs = [0.0] * 120
+        for c in hand_to_list(others):
+            self.probs[c] = self.probs[40 + c] = self.probs[80 + c] = 1 / 3
+
+    # Probability that the player i has the card c
+    def prob(self, i, c):
+        if i == 0:
+            return float(self.hands[0] >> c & 1)
+        return self.probs[(i - 1) * 40 + c]
+
+    # The player i played the card c in a round where the asked suit is asked
+    def play(self, i, c, asked):
+        for j in range(4):
+            self.hands[j] = remove_card(self.hands[j], 1 << c)
+        for j in range(3):
+            self.probs[j * 40 + c] = 0.0
+        if not asked >> c & 1:
+            self.void(i, asked)
+
+    # The player i has no card of the suit anymore
+    def void(self, i, suit):
+        cards = dot(self.hands[i], suit)
+        self.hands[i] = remove_card(self.hands[i], suit)
+        self.voids[i] = add_cap(self.voids[i], suit)
+        if i == 0:
+            return
+        for c in hand_to_list(cards):
+            # The card is shared between the players that may still have it
+            holders = [j for j in range(1, 4) if self.hands[j] >> c & 1]
+            for j in range(1, 4):
+                self.probs[(j - 1) * 40 + c] = 1 / len(holders) if j in holders else 0.0
+
+
+# The interesting strategy
+class dp_strategy:
+
+    turn_kick_in = 0
+    current_turn = 0
+
+    def __init__(self, turn_kick_in, heuristic, aggregator, memo=None, prune=False, rng=random, stats=None, time_budget=None, node_budget=None, endgame=3, samples=None, sample_depth=2, workers=None, ordering=False, symmetry=False, book=None):
+        self.belief = None # belief_state of the game being played
+        self.turn_kick_in = turn_kick_in
+        self.current_turn = 10
+        self.heuristic = heuristic
+        self.aggregator = aggregator
+        # Transposition table of the dp algorithm. Pass the same table to several
+        # strategies to share it (for example for a whole configuration)
+        self.memo = memo if memo is not None else transposition_table()
+        # Prune the search (same card played, fewer positions visited)
+        self.prune = prune
+        # Random generator of the turns played before the dp kicks in
+        self.rng = rng
+        # Statistics of the searches (see search_stats)
+        self.stats = stats
+        # Budget of each move, in seconds and in positions. With a budget, the depth is not fixed:
+        # the search goes deeper and deeper until the budget is spent (the endgame solver and the
+        # sampling search solve the deals until it is spent)
+        self.time_budget = time_budget
+        self.node_budget = node_budget
+        self.last_depth = 0 # Depth of the last search that finished
+        # In the last endgame rounds, the exact endgame solver plays instead of the dp algorithm (0 to never use it)
+        self.endgame = endgame
+        self.endgame_cache = {}
+        # With a number of samples, the sampling search plays instead of the dp algorithm
+        # (sample_depth rounds are played in each deal before the heuristic)
+        self.samples = samples
+        self.sample_depth = sample_depth
+        # With several workers, the root cards (or the deals) are searched on a pool of processes.
+        # The searches with a budget stay in this process
+        self.workers = workers
+        if workers is not None and workers > 1:
+            # The workers get the heuristic and the aggregator by name, check them now and not in the game
+            registered_name(heuristics, heuristic)
+            registered_name(aggregators, aggregator)
+        # Order the actions of the searches (see move_ordering), the tables are kept for the whole game
+        self.ordering = move_ordering() if ordering else None
+        # Share the searches of the positions that are the same up to a swap of suits (see SUIT SYMMETRIES)
+        self.symmetry = symmetry
+        # The opening book (see OPENING BOOK) plays the first round when it knows the position
+        self.book = book
+        
+
+    def play_card(self, hand, playable_hand, asked, atout, winner, table, current):
+        # Play the card according to the dp strategy
+
+        if not asked:
+            asked = all_hand
+        
+        if atout is False: # Not known yet (0 is a game without atout)
+            atout = all_hand
+
+        # The first time we play the card, we initialize the cards left (that other players have)
+        if self.current_turn == 10:
+            self.belief = belief_state(hand)
+            self.endgame_cache.clear()
+            if self.ordering is not None:
+                self.ordering.clear()
+
+        card_to_play = -1
+        if self.book is not None and self.current_turn == 10:
+            played = [table[(winner + k) % 4] for k in range((current - winner) % 4)]
+            card_to_play = self.book.card(hand, playable_hand, asked, atout, played)
+
+        if card_to_play != -1:
+            pass
+        elif self.current_turn > self.turn_kick_in:
+            card_to_play = random_strategy(self.rng).play_card(hand, playable_hand, asked, atout, winner, table, current)
+        else:
+            # Deck to tell the algorithm what cards are left to play
+            iter_deck = [
+                playable_hand,
+                all_hand if table[(current+1)%4] is None else 1 << table[(current+1)%4],
+                all_hand if table[(current+2)%4] is None else 1 << table[(current+2)%4],
+                all_hand if table[(current+3)%4] is None else 1 << table[(current+3)%4],
+            ]
+
+            # Shortcut if we have only one playable card
+            if popcount(playable_hand) == 1:
+                card_to_play = first(playable_hand)
+            else:
+                start = time.perf_counter()
+                if self.current_turn <= self.endgame:
+                    # Cards already played this round, from the player that started it
+                    played = [table[(winner + k) % 4] for k in range((current - winner) % 4)]
+                    score, card_to_play = endgame_solver(self.left, atout, played, playable_hand, self.endgame_cache, self.workers, self.move_budget())
+                    if card_to_play is None:
+                        card_to_play = random_strategy(self.rng).play_card(hand, playable_hand, asked, atout, winner, table, current)
+                elif self.samples is not None:
+                    played = [table[(winner + k) % 4] for k in range((current - winner) % 4)]
+                    score, card_to_play = sampling_search(self.belief, atout, played, playable_hand, self.endgame_cache, self.samples, self.sample_depth, self.heuristic, self.rng, self.workers, self.move_budget())
+                    if card_to_play is None:
+                        card_to_play = random_strategy(self.rng).play_card(hand, playable_hand, asked, atout, winner, table, current)
+                elif self.time_budget is None and self.node_budget is None:
+                    depth = 1 if self.current_turn > 3 else 3
+            
+                    # Call to the actual dp algorithm
+                    if self.workers is not None and self.workers > 1:
+                        score, card_to_play = parallel_dp(self.left, (current-winner) % 4, atout, depth, self.current_turn, iter_deck, self.heuristic, self.aggregator, self.prune, self.workers, self.stats, self.ordering is not None, self.symmetry)
+                        if card_to_play is None:
+                            card_to_play = random_strategy(self.rng).play_card(hand, playable_hand, asked, atout, winner, table, current)
+                    else:
+                        score, card_to_play, _ = dp_algorithm(self.left, (current-winner) % 4, atout, depth, self.current_turn, force=iter_deck, heuristic=self.heuristic, aggregate=self.aggregator, memo=self.memo, prune=self.prune, stats=self.stats, ordering=self.ordering, symmetry=self.symmetry)
+                else:
+                    card_to_play = self.iterative_deepening((current-winner) % 4, atout, iter_deck)
+                    if card_to_play is None:
+                        # Not even the first depth finished in time
+                        card_to_play = random_strategy(self.rng).play_card(hand, playable_hand, asked, atout, winner, table, current)
+                if self.stats is not None:
+                    self.stats.add_move(time.perf_counter() - start)
+
+        self.current_turn -= 1
+        return card_to_play
+
+    # Search deeper and deeper until the budget of the move is spent
+    #  Returns the card of the deepest search that finished (None if none did). The searches share
+    #  the transposition table: the best card of a position found by a search is tried first by
+    #  the next one, so the next search prunes more.
+    # The search_budget of a move (None without budget)
+    #  The endgame solver and the sampling search solve the deals until it is spent.
+    def move_budget(self):
+        if self.time_budget is None and self.node_budget is None:
+            return None
+        return search_budget(self.time_budget, self.node_budget)
+
+    def iterative_deepening(self, start_player, atout, iter_deck):
+        budget = self.move_budget()
+        # Without a shared table, the searches of this move still share one
+        memo = self.memo if self.memo is not None else transposition_table()
+        card_to_play = None
+        self.last_depth = 0
+        # With card_per_player - 1 turns, the search reaches the end of the game
+        for depth in range(1, max(self.current_turn - 1, 1) + 1):
+            try:
+                score, card_to_play, _ = dp_algorithm(self.left, start_player, atout, depth, self.current_turn, force=iter_deck, heuristic=self.heuristic, aggregate=self.aggregator, memo=memo, prune=self.prune, stats=self.stats, budget=budget, order=True, ordering=self.ordering, symmetry=self.symmetry)
+            except search_timeout:
+                break
+            self.last_depth = depth
+        return card_to_play
+        
+
+    # The cards that each player may have (see belief_state)
+    @property
+    def left(self):
+        return self.belief.hands
+
+    def update_played(self, table, asked, current):
+        # Update the beleif state according to what the other players played
+        for i in range(4):
+            self.belief.play(i, table[(current + i) % 4], asked)
+        
@@ -0,0 +1,440 @@
+from collections import defaultdict
+import sys
+import os
+import json
+import math
+import time
+import statistics
+
+from .cards import print_score
+from .strategies import dp_strategy, highest_strategy, random_strategy
+from .search import aggregators, heuristics, search_stats, transposition_table
+from .engine import deal_corpus, game, make_deal, play_rng
+from .book import opening_book
+
+# ==== TOURNAMENT ====
+
+# The other players that can be tested, by name
+others = {
+    "random bot": random_strategy,
+    "highest bot": highest_strategy,
+}
+
+# Play the games of one chunk of a cell and return one record per game
+#  A cell is (heuristic, aggregator, kick_in, other, dp_first). The game with seed s plays the
+#  deal make_deal(s), or the deal s of a deal corpus (modulo the size of the corpus), and the
+#  players have their own random generator play_rng(s). So the result does not depend on how the
+#  games are split in chunks.
+#  With profile, the search statistics of the chunk are returned with the records.
+#  book is the path of an opening book for the dp strategies (see OPENING BOOK).
+def play_chunk(cell, seeds, trick_log=False, corpus=None, profile=False, prune=False, ordering=False, endgame=3, book=None):
+    heuristic, aggregator, kick_in, other, dp_first = cell
+    memo = transposition_table()
+    deals = deal_corpus(corpus) if corpus is not None else None
+    stats = search_stats() if profile else None
+    opening = opening_book(book) if book is not None else None
+
+    records = []
+    for s in seeds:
+        rng = play_rng(s)
+        gen_dp = lambda: dp_strategy(kick_in, heuristics[heuristic], aggregators[aggregator], memo=memo, rng=rng, stats=stats, prune=prune, ordering=ordering, endgame=endgame, book=opening)
+        if dp_first:
+            strategies = [gen_dp(), others[other](rng), gen_dp(), others[other](rng)]
+        else:
+            strategies = [others[other](rng), gen_dp(), others[other](rng), gen_dp()]
+        log = [] if trick_log else None
+        deal = deals[s % len(deals)] if deals is not None else make_deal(s)
+        game_score = game(verbose=False, strategies=strategies, log=log, deal=deal, rng=rng, validate=False)
+        records.append(make_record(cell, s, game_score, log))
+
+    if deals is not None:
+        deals.close()
+    if opening is not None:
+        opening.close()
+    return records, stats
+
+# Play n_games games for each cell on a pool of processes
+#  The games are sent to the workers in chunks of chunk_size games. The game i of the cell c
+#  is seeded with base_seed + c * n_games + i, so a tournament can be replayed exactly.
+#  With paired, the game i of every cell is seeded with base_seed + i: all the cells play the
+#  same deals, which makes the comparison of two cells much more precise.
+#  corpus is the path of a deal corpus to take the deals from (see save_deal_corpus).
+#  With profile, the search statistics of each cell are printed after its score.
+#  If results is the path of a results file, every game is written to it. The games that are
+#  already in the file are not played again, so an interrupted tournament can be resumed (with
+#  the same base_seed, paired and corpus, see done_games).
+#  Returns the total score of each cell, in the same order as the cells.
+def run_tournament(cells, n_games=100, workers=None, chunk_size=10, base_seed=0, verbose=True, results=None, trick_log=False, paired=False, corpus=None, profile=False):
+    settings = run_settings(base_seed, paired, corpus)
+    done = done_games(results, settings)
+
+    chunks = []
+    previous = []
+    for c, cell in enumerate(cells):
+        first_seed = base_seed if paired else base_seed + c * n_games
+        seeds = range(first_seed, first_seed + n_games)
+        # Only the games of the seeds of the cell count, the file can have more
+        previous.append([done[cell][s] for s in seeds if s in done[cell]])
+        seeds = [s for s in seeds if s not in done[cell]]
+        chunks.append([(cell, seeds[i:i + chunk_size], trick_log, corpus, profile) for i in range(0, len(seeds), chunk_size)])
+
+    sink = results_sink(results, settings=settings) if results is not None else None
+    from concurrent.futures import ProcessPoolExecutor
+    pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count()) if workers != 1 else None
+    try:
+        if pool is not None:
+            # Submit everything first so that all the workers stay busy
+            futures = [[pool.submit(play_chunk, *chunk) for chunk in cell_chunks] for cell_chunks in chunks]
+
+        totals = []
+        for c, cell in enumerate(cells):
+            if pool is not None:
+                chunk_records = (f.result() for f in futures[c])
+            else:
+                chunk_records = (play_chunk(*chunk) for chunk in chunks[c])
+            totals.append(merge_scores(chunk_records, cell, previous[c], sink, verbose))
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        if sink is not None:
+            sink.close()
+    return totals
+
+# Sum the scores of the chunks of a cell, printing the cell like the sweep always did
+#  previous are the scores of the games of the cell that were already played
+def merge_scores(chunk_records, cell, previous=(), sink=None, verbose=True):
+    if verbose:
+        print(describe_cell(cell), end="")
+        sys.stdout.flush()
+
+    total_score = [0, 0, 0, 0]
+    for score in previous:
+        total_score = [x + y for x, y in zip(score, total_score)]
+
+    cell_stats = None
+    for records, stats in chunk_records:
+        for record in records:
+            total_score = [x + y for x, y in zip(record["scores"], total_score)]
+            if sink is not None:
+                sink.write(record)
+        if stats is not None:
+            cell_stats = cell_stats or search_stats()
+            cell_stats.merge(stats)
+        if verbose:
+            print(".", end="")
+            sys.stdout.flush()
+
+    if verbose:
+        print_score(total_score)
+        if cell_stats is not None:
+            print("   ", cell_stats.summary())
+        sys.stdout.flush()
+    return total_score
+
+
+# The line that starts the output of a cell
+def describe_cell(cell):
+    heuristic, aggregator, kick_in, other, dp_first = cell
+    starting = f"DP vs {other}" if dp_first else f"{other} vs DP"
+    return f"{starting} -- heuristic={heuristic}, aggregator={aggregator}, kick_in={kick_in}"
+
+# ADAPTIVE EVALUATION
+#  100 games are too few to separate two close cells and too many for a cell that is clearly
+#  worse. Here the cells play a few games at a time and the result of a cell is the advantage of
+#  the dp team (its points minus the points of the other team) in the mean over the games, with a
+#  confidence interval.
+#  The seat that starts the first round is worth a few points per game, so the cells are compared
+#  by arm: an arm is a cell without dp_first (heuristic, aggregator, kick_in, other) and its two
+#  seatings play the same deals. The advantage of an arm on a deal is the mean of the advantages
+#  of its seatings, which cancels the seat.
+
+# Points of the dp team minus points of the other team in a game of the cell
+def dp_advantage(cell, scores):
+    dp_first = cell[4]
+    advantage = scores[0] + scores[2] - scores[1] - scores[3]
+    return advantage if dp_first else -advantage
+
+# Mean and half width of the confidence interval of the mean (normal approximation, z=1.96 for 95%)
+def mean_interval(values, z=1.96):
+    if len(values) < 2:
+        return (values[0] if values else 0), math.inf
+    return statistics.mean(values), z * statistics.stdev(values) / math.sqrt(len(values))
+
+# The arm of a cell (the cell without dp_first)
+def cell_arm(cell):
+    return cell[:4]
+
+# The line that starts the output of an arm
+def describe_arm(arm):
+    heuristic, aggregator, kick_in, other = arm
+    return f"DP vs {other} (both seats) -- heuristic={heuristic}, aggregator={aggregator}, kick_in={kick_in}"
+
+# Games of a set of cells, played a few at a time on a pool of processes
+#  The cells of an arm play the same seeds: the game i of the arm a is seeded with base_seed +
+#  a * max_games + i (base_seed + i with paired, like in run_tournament). With a results file,
+#  the games are written to it and the games already in it are not played again (with the same
+#  settings, see done_games).
+class cell_games:
+
+    def __init__(self, cells, max_games=1000, workers=None, chunk_size=10, base_seed=0, results=None, paired=False, corpus=None):
+        self.cells = cells
+        self.max_games = max_games
+        self.chunk_size = chunk_size
+        self.base_seed = base_seed
+        self.paired = paired
+        self.corpus = corpus
+        self.advantages = {cell: {} for cell in cells} # Advantage of each cell, by seed
+        self.arms = {} # Cells of each arm, the arms in the order of the cells
+        for cell in cells:
+            self.arms.setdefault(cell_arm(cell), []).append(cell)
+        self.arm_index = {arm: a for a, arm in enumerate(self.arms)}
+
+        settings = run_settings(base_seed, paired, corpus)
+        self.done = done_games(results, settings)
+        self.sink = results_sink(results, settings=settings) if results is not None else None
+        from concurrent.futures import ProcessPoolExecutor
+        self.pool = ProcessPoolExecutor(max_workers=workers or os.cpu_count()) if workers != 1 else None
+
+    # Play the games of the arms until each one has n deals (max_games at most)
+    def play_until(self, arms, n):
+        n = min(n, self.max_games)
+        jobs = []
+        for arm in arms:
+            first_seed = self.base_seed if self.paired else self.base_seed + self.arm_index[arm] * self.max_games
+            for cell in self.arms[arm]:
+                seeds = [s for s in range(first_seed, first_seed + n) if s not in self.advantages[cell]]
+                for s in seeds:
+                    if s in self.done[cell]:
+                        self.advantages[cell][s] = dp_advantage(cell, self.done[cell][s])
+                seeds = [s for s in seeds if s not in self.done[cell]]
+                for i in range(0, len(seeds), self.chunk_size):
+                    jobs.append((cell, seeds[i:i + self.chunk_size], False, self.corpus))
+
+        if self.pool is not None:
+            chunks = [f.result() for f in [self.pool.submit(play_chunk, *job) for job in jobs]]
+        else:
+            chunks = [play_chunk(*job) for job in jobs]
+        for (cell, *_), (records, stats) in zip(jobs, chunks):
+            for record in records:
+                self.advantages[cell][record["seed"]] = dp_advantage(cell, record["scores"])
+                if self.sink is not None:
+                    self.sink.write(record)
+
+    # Advantage of an arm on each deal that all its cells played
+    def arm_advantages(self, arm):
+        cells = [self.advantages[cell] for cell in self.arms[arm]]
+        return [sum(a[s] for a in cells) / len(cells) for s in sorted(cells[0]) if all(s in a for a in cells)]
+
+    def interval(self, arm, z=1.96):
+        return mean_interval(self.arm_advantages(arm), z)
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+        if self.sink is not None:
+            self.sink.close()
+
+    # Print the result of an arm
+    def print_arm(self, arm, z=1.96, note=""):
+        mean, half = self.interval(arm, z)
+        print(f"{describe_arm(arm)}: {mean:+.2f} +- {half:.2f} ({len(self.arm_advantages(arm))} deals){note}")
+        sys.stdout.flush()
+
+# z of each look of a sequential test with the error rate of z (Bonferroni correction)
+#  The interval of an arm is tested after each batch: with the same z at every look, an arm that
+#  is no better than the others stops much more often than 5% of the time (z=1.96). Splitting
+#  the error rate between the looks keeps it below the one of z.
+def sequential_z(z, looks):
+    normal = statistics.NormalDist()
+    return normal.inv_cdf(1 - (1 - normal.cdf(z)) / max(looks, 1))
+
+# Play the arms of the cells batch deals at a time until the confidence interval of the advantage
+#  of an arm does not contain 0 (the dp team is better or worse for sure), or until it played
+#  max_games deals. An arm does not stop before min_games deals (the normal approximation of the
+#  interval needs a few dozen deals), and the interval of each look is the one of sequential_z:
+#  an arm stops with the wrong sign in less than 5% of the runs (z=1.96) with this correction.
+#  The other arguments are the ones of cell_games.
+#  Returns the arms, in the order of the cells, each one with (mean, half width, deals), the half
+#  width with the z of the looks.
+def run_adaptive(cells, batch=20, max_games=1000, z=1.96, min_games=30, verbose=True, **kwargs):
+    games = cell_games(cells, max_games, **kwargs)
+    # The looks where an arm can stop: after each batch from min_games deals to max_games deals
+    looks = math.ceil(max_games / batch) - math.ceil(min(min_games, max_games) / batch) + 1
+    z = sequential_z(z, looks)
+    try:
+        active = list(games.arms)
+        n = 0
+        while active:
+            n += batch
+            games.play_until(active, n)
+            still = []
+            for arm in active:
+                mean, half = games.interval(arm, z)
+                deals = len(games.arm_advantages(arm))
+                if (deals >= min_games and abs(mean) > half) or deals >= max_games:
+                    if verbose: games.print_arm(arm, z)
+                else:
+                    still.append(arm)
+            active = still
+    finally:
+        games.close()
+    return [(arm, (*games.interval(arm, z), len(games.arm_advantages(arm)))) for arm in games.arms]
+
+# Successive halving: the games go to the best arms
+#  At each round, the remaining arms play deals until they have batch * 2**round deals each, then
+#  only the best half of them (by mean advantage) stays. Ends when one arm is left or when the
+#  arms played max_games deals. The other arguments are the ones of cell_games.
+#  Returns the arms from the best to the worst (the last ones are the first eliminated), each
+#  one with (mean, half width, deals).
+def successive_halving(cells, batch=20, max_games=1000, z=1.96, keep=0.5, verbose=True, **kwargs):
+    games = cell_games(cells, max_games, **kwargs)
+    eliminated = []
+    try:
+        active = list(games.arms)
+        n = batch
+        while True:
+            games.play_until(active, n)
+            active.sort(key=lambda arm: games.interval(arm, z)[0], reverse=True)
+            if len(active) == 1 or n >= max_games:
+                break
+            kept = max(1, int(len(active) * keep))
+            if verbose:
+                for arm in active[kept:]:
+                    games.print_arm(arm, z, " eliminated")
+            eliminated = active[kept:] + eliminated
+            active = active[:kept]
+            n *= 2
+        if verbose:
+            for arm in active:
+                games.print_arm(arm, z)
+    finally:
+        games.close()
+    return [(arm, (*games.interval(arm, z), len(games.arm_advantages(arm)))) for arm in active + eliminated]
+
+# Compare the positions the searches of a cell expand with and without move ordering
+#  Plays the first n_games deals of a deal corpus with pruning (without pruning, the order of the
+#  actions changes nothing) and without the endgame solver, so the deepest searches are done by
+#  dp_algorithm, and prints the statistics of both. The ordering can choose another card
+#  when several cards have the same value, so the games are not always exactly the same.
+#  Returns the two search_stats (without ordering, with ordering).
+def ordering_report(cell, corpus, n_games=20):
+    heuristic, aggregator, kick_in, other, dp_first = cell
+    print(f"Move ordering -- heuristic={heuristic}, aggregator={aggregator}, kick_in={kick_in}")
+    all_stats = []
+    for ordering in (False, True):
+        start = time.perf_counter()
+        records, stats = play_chunk(cell, range(n_games), corpus=corpus, profile=True, prune=True, ordering=ordering, endgame=0)
+        total_score = [sum(r["scores"][i] for r in records) for i in range(4)]
+        print(f"    ordering={ordering} nodes={sum(stats.nodes.values())} heuristic={stats.heuristic_calls} time={time.perf_counter() - start:.1f}s", end=" ")
+        print_score(total_score)
+        all_stats.append(stats)
+    before, after = (sum(s.nodes.values()) for s in all_stats)
+    print(f"    {100 * (after - before) / max(before, 1):+.1f}% nodes")
+    return all_stats
+
+
+# ==== RESULTS ====
+# The results of a tournament are written game by game to a file with one JSON record per line.
+#  The file is only appended to, so it can be read back at any time (even while it is written)
+#  to aggregate the results without playing the games again.
+#  Each record also has the settings of the run that decide the games of the seeds (base_seed,
+#  paired and corpus), so a run does not resume from the games of another one.
+
+# The settings of a run that are written in its records
+def run_settings(base_seed, paired, corpus):
+    return {"base_seed": base_seed, "paired": paired, "corpus": corpus}
+
+# Scores of the games of a results file, by cell and seed (empty if there is no file)
+#  The file must have been written with the same settings, a file of another run is refused.
+def done_games(path, settings):
+    done = defaultdict(dict)
+    if path is not None and os.path.exists(path):
+        for record in read_results(path):
+            written = {key: record.get(key) for key in settings}
+            if written != settings:
+                raise ValueError("the results file was written with other settings", path, written, settings)
+            done[record_cell(record)][record["seed"]] = record["scores"]
+    return done
+
+# The record of one game
+def make_record(cell, game_seed, scores, log=None):
+    heuristic, aggregator, kick_in, other, dp_first = cell
+    record = {
+        "seed": game_seed,
+        "heuristic": heuristic,
+        "aggregator": aggregator,
+        "kick_in": kick_in,
+        "other": other,
+        "dp_first": dp_first,
+        "scores": scores,
+    }
+    if log is not None:
+        record["tricks"] = log
+    return record
+
+# The cell of a record
+def record_cell(record):
+    return (record["heuristic"], record["aggregator"], record["kick_in"], record["other"], record["dp_first"])
+
+# Append-only writer of records
+#  The records are kept in memory and written batch_size at a time. settings are added to every
+#  record (see run_settings).
+class results_sink:
+
+    def __init__(self, path, batch_size=1000, settings=None):
+        # Finish the last line if it was cut by an interrupted run
+        cut = False
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, "rb") as f:
+                f.seek(-1, os.SEEK_END)
+                cut = f.read(1) != b"\n"
+
+        self.file = open(path, "a")
+        if cut:
+            self.file.write("\n")
+        self.batch_size = batch_size
+        self.settings = settings or {}
+        self.buffer = []
+
+    def write(self, record):
+        self.buffer.append(json.dumps({**record, **self.settings}, separators=(",", ":")))
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.buffer:
+            self.file.write("\n".join(self.buffer) + "\n")
+            self.buffer = []
+        self.file.flush()
+
+    def close(self):
+        self.flush()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+# Read the records of a results file
+#  A line that was cut (the run was interrupted while writing) is skipped
+def read_results(path):
+    with open(path) as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+# Total score and number of games of each cell of a results file
+#  A game that is in the file more than once (two runs on the same file) is counted once.
+def aggregate_results(path):
+    games = {}
+    for record in read_results(path):
+        games[record_cell(record), record["seed"]] = record["scores"]
+    totals = {}
+    for (cell, seed), scores in games.items():
+        total_score, n = totals.get(cell, ([0, 0, 0, 0], 0))
+        totals[cell] = ([x + y for x, y in zip(scores, total_score)], n + 1)
+    return totals
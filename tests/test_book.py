@@ -0,0 +1,62 @@
+import random
+
+import pytest
+
+from pix.cards import all_hand, attribute_cards, hand_to_list, playable_cards, suit_of, suits
+from pix.engine import make_deal
+from pix.book import action_card, build_opening_book, card_action, opening_book, pattern_suits, save_opening_book
+
+# ==== OPENING BOOK ====
+
+def test_book_save_and_lookup(tmp_path):
+    path = str(tmp_path / "book.bin")
+    rng = random.Random(0)
+    entries = {rng.getrandbits(60): rng.randrange(20) for _ in range(1000)}
+    entries[0] = 7
+    save_opening_book(path, entries)
+    book = opening_book(path)
+    try:
+        assert len(book) == len(entries)
+        assert all(book.get(key) == action for key, action in entries.items())
+        assert all(book.get(key) is None for key in (rng.getrandbits(60) for _ in range(1000)) if key not in entries)
+    finally:
+        book.close()
+
+    with open(path, "r+b") as f:
+        f.write(b"NOTABOOK")
+    with pytest.raises(ValueError):
+        opening_book(path)
+
+def test_card_action_round_trip():
+    for seed in range(50):
+        hand = attribute_cards(make_deal(seed))[0]
+        atout = suits[seed % 4]
+        order = pattern_suits(hand, all_hand, atout)
+        assert sorted(order) == [0, 1, 2, 3] and order[0] == seed % 4
+        for c in hand_to_list(hand):
+            action = card_action(hand, order, c)
+            assert action is None or action_card(hand, order, action) == c
+        for action in range(20):
+            c = action_card(hand, order, action)
+            # The only other card of a suit is both its highest and its lowest other card
+            assert c == -1 or (hand >> c & 1 and card_action(hand, order, c) in (action, action - (action % 5 == 4)))
+
+def test_built_book_plays_first_round(tmp_path):
+    path = str(tmp_path / "book.bin")
+    assert build_opening_book(path, n_deals=4, samples=4, workers=1, verbose=False) > 0
+    book = opening_book(path)
+    try:
+        for seed in range(8):
+            hands = attribute_cards(make_deal(seed))
+            played = []
+            for seat in range(4):
+                asked = suit_of[played[0]] if played else all_hand
+                playable = playable_cards(hands[seat], asked)
+                c = book.card(hands[seat], playable, asked, asked, played)
+                assert c == -1 or playable >> c & 1
+                # The first player of the deals of the book is in the book
+                if seed < 4 and seat == 0:
+                    assert c != -1
+                played.append(hand_to_list(playable)[0])
+    finally:
+        book.close()
@@ -0,0 +1,79 @@
+import math
+import random
+from itertools import combinations
+
+from pix.cards import hand_to_list, make_hand, playable_cards, suit_of, suits, trick_result
+from pix.endgame import endgame_search, endgame_solver, round_pins
+
+# ==== ENDGAME SOLVER ====
+# The alpha-beta search of the endgame and the solver over the deals of the unknown cards must give
+#  the values of a plain minimax.
+
+# Hands of k cards for the 4 players, from a random deck
+def random_hands(rng, k):
+    cards = rng.sample(range(40), 4 * k)
+    return [make_hand(*cards[i * k:(i + 1) * k]) for i in range(4)]
+
+# Value of a round where every hand is known, by trying every card (no alpha-beta, no cache)
+def minimax(hands, leader, atout, played):
+    if len(played) == 4:
+        winner, points = trick_result(played, suit_of[played[0]], atout)
+        winner = (leader + winner) % 4
+        value = points if winner % 2 == 0 else -points
+        return value if hands[0] == 0 else value + minimax(hands, winner, atout, [])
+    player = (leader + len(played)) % 4
+    playable = playable_cards(hands[player], suit_of[played[0]]) if played else hands[player]
+    values = []
+    for c in hand_to_list(playable):
+        next_hands = hands[:]
+        next_hands[player] &= ~(1 << c)
+        values.append(minimax(next_hands, leader, atout, played + [c]))
+    return max(values) if player % 2 == 0 else min(values)
+
+def test_endgame_search_is_minimax():
+    rng = random.Random(1)
+    for _ in range(200):
+        hands = random_hands(rng, rng.randint(1, 3))
+        atout = rng.choice(suits + [0])
+        leader = rng.randrange(4)
+        cache = {}
+        expected = minimax(hands, leader, atout, [])
+        assert endgame_search(hands, leader, atout, -math.inf, math.inf, cache) == expected
+        # With a window, the value is exact inside it and a bound outside (the cache is reused)
+        for alpha, beta in [(-10, 10), (0, 5), (-30, -20)]:
+            v = endgame_search(hands, leader, atout, alpha, beta, cache)
+            assert (v <= alpha and expected <= v) or (v >= beta and expected >= v) or v == expected
+
+def test_endgame_solver_is_mean_of_minimax():
+    rng = random.Random(2)
+    for _ in range(40):
+        k = rng.choice([1, 2, 2])
+        hands = random_hands(rng, k)
+        atout = rng.choice(suits)
+        # The first players of the round already played (the player 0 is the next one)
+        played = []
+        for i in range(4 - rng.randrange(4), 4):
+            played.append(rng.choice(hand_to_list(playable_cards(hands[i], suit_of[played[0]]) if played else hands[i])))
+        leader, pinned = round_pins(played)
+        others = hands[1] | hands[2] | hands[3]
+        left = [hands[0], others, others, others]
+        playable = playable_cards(hands[0], suit_of[played[0]]) if played else hands[0]
+
+        # Every deal of the unknown cards, the cards of the round stay with their players
+        unknown = hand_to_list(others & ~make_hand(*played))
+        totals = {c: 0 for c in hand_to_list(playable)}
+        n_deals = 0
+        for first in combinations(unknown, k - (pinned[1] is not None)):
+            rest = [c for c in unknown if c not in first]
+            for second in combinations(rest, k - (pinned[2] is not None)):
+                third = [c for c in rest if c not in second]
+                deal = [hands[0], make_hand(*first), make_hand(*second), make_hand(*third)]
+                n_deals += 1
+                for c in totals:
+                    next_hands = deal[:]
+                    next_hands[0] &= ~(1 << c)
+                    totals[c] += minimax(next_hands, leader, atout, played + [c])
+
+        value, card = endgame_solver(left, atout, played, playable, {})
+        assert math.isclose(value, max(totals.values()) / n_deals)
+        assert totals[card] == max(totals.values())
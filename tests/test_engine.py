@@ -0,0 +1,99 @@
+import random
+
+import pytest
+
+from pix.cards import attribute_cards, popcount, score, suit_of, suits
+from pix.strategies import random_strategy
+from pix.engine import bet_rule, deal_corpus, default_bet, default_bid, game, game_engine, make_deal, no_atout_rule, play_rng, save_deal_corpus
+
+# ==== DEALS ====
+
+def test_deal_corpus_is_make_deal(tmp_path):
+    path = str(tmp_path / "deals.bin")
+    save_deal_corpus(path, 5, base_seed=7)
+    corpus = deal_corpus(path)
+    try:
+        assert len(corpus) == 5
+        assert [corpus[i] for i in range(5)] == [make_deal(7 + i) for i in range(5)]
+    finally:
+        corpus.close()
+
+def test_seat_shift_moves_the_hands():
+    deal = make_deal(3)
+    hands = attribute_cards(deal)
+    for shift in range(4):
+        shifted = attribute_cards(deal, shift)
+        assert [shifted[(i + shift) % 4] for i in range(4)] == hands
+    # The first card of the game is played from the hand of the seat 0, which holds the hand
+    #  of the seat 4 - shift of the deal
+    for shift in range(4):
+        log = []
+        rng = play_rng(3)
+        game(verbose=False, strategies=[random_strategy(rng) for _ in range(4)], log=log, deal=deal, seat_shift=shift)
+        assert hands[-shift % 4] >> log[0][1][0] & 1
+
+def test_seeded_game_is_reproducible():
+    logs = []
+    for _ in range(2):
+        log = []
+        rng = play_rng(11)
+        scores = game(verbose=False, strategies=[random_strategy(rng) for _ in range(4)], log=log, deal=make_deal(11))
+        logs.append((scores, log))
+    assert logs[0] == logs[1]
+    # The players do not draw from the stream of the deal
+    assert play_rng(11).random() != random.Random(11).random()
+
+# ==== RULES ====
+
+def test_no_atout_rule_asked_suit_wins():
+    for seed in range(20):
+        log = []
+        rng = play_rng(seed)
+        scores = game(verbose=False, strategies=[random_strategy(rng) for _ in range(4)], log=log, deal=make_deal(seed), rule=no_atout_rule(leader=seed % 4))
+        assert sum(scores) == 100
+        leader = seed % 4
+        for winner, table in log:
+            asked = suit_of[table[leader]]
+            # The highest card of the asked suit (the smallest index) wins
+            assert table[winner] == min(c for c in table if suit_of[c] == asked)
+            leader = winner
+
+def test_default_bet():
+    hand = attribute_cards(make_deal(0))[0]
+    points = score(hand) + 10 * max(popcount(hand & s) for s in suits)
+    bet = default_bet(hand, 0, minimum=0)
+    assert bet is not None and bet[0] == min(points - points % 5, 100) and hand & bet[1]
+    # A bet is higher than the best one and at least the minimum
+    assert default_bet(hand, bet[0], minimum=0) is None
+    assert default_bet(hand, 0, minimum=bet[0] + 5) is None
+    assert default_bet(hand, 0, minimum=0, step=10)[0] % 10 == 0
+
+# A random strategy that makes a given bid
+class bidder(random_strategy):
+
+    def __init__(self, bid):
+        super().__init__(random.Random(0))
+        self.fixed_bid = bid
+
+    def bid(self, hand, best):
+        return self.fixed_bid
+
+def test_bet_rule():
+    board = attribute_cards(make_deal(4))
+    # The highest bet chooses the atout and starts the game
+    rule = bet_rule(first=1)
+    engine = game_engine([bidder(None), bidder((60, suits[2])), bidder((70, suits[1])), bidder(None)], rule)
+    engine.play(board)
+    assert engine.state.bet == (2, 70) and engine.state.atout == suits[1]
+    assert rule.made(engine.state) == (engine.state.scores[0] + engine.state.scores[2] >= 70)
+
+    # If every player passes, the last one takes the minimum with its own suit
+    engine = game_engine([bidder(None) for _ in range(4)], bet_rule(minimum=55, first=2))
+    engine.play(board)
+    assert engine.state.bet == (1, 55) and engine.state.atout == default_bid(board[1])[1]
+
+    # A bet under the minimum, not higher than the best one, or not a multiple of step is refused
+    for bids in [[(45, suits[0])], [(60, suits[0]), (60, suits[1])], [(62, suits[0])], [(60, 3)]]:
+        strategies = [bidder(b) for b in bids] + [bidder(None) for _ in range(4 - len(bids))]
+        with pytest.raises(Exception):
+            game_engine(strategies, bet_rule()).play(board)
@@ -0,0 +1,109 @@
+import math
+import random
+from itertools import combinations
+
+from pix.cards import all_hand, hand_to_list, make_hand, popcount, suits
+from pix.search import aggregators, dp_algorithm, hall_valid, heuristics, min_utility, transposition_table
+
+# ==== TRANSPOSITION TABLE ====
+
+def test_transposition_table_evicts_least_recently_used():
+    table = transposition_table(max_size=3)
+    for k in "abc":
+        table.set(k, k.upper())
+    # Reading a makes b the oldest entry
+    assert table.get("a") == "A"
+    table.set("d", "D")
+    assert len(table) == 3 and table.evictions == 1
+    assert table.get("b") is None
+    assert [table.get(k) for k in "acd"] == ["A", "C", "D"]
+    assert (table.hits, table.misses) == (4, 1)
+    table.clear()
+    assert len(table) == 0 and (table.hits, table.misses, table.evictions) == (0, 0, 0)
+
+def test_shared_table_is_fresh_table():
+    # The positions of different atouts, start players and depths must not share entries
+    rng = random.Random(5)
+    shared = transposition_table()
+    for trial in range(30):
+        hands = random_hands(rng, 2)
+        others = hands[1] | hands[2] | hands[3]
+        deck = [hands[0], others, others, others]
+        start_player = rng.randrange(4)
+        atout = rng.choice([*suits, 0])
+        depth = rng.choice([1, 2])
+        args = (deck, start_player, atout, depth, 2)
+        assert dp_algorithm(*args, memo=shared)[:2] == dp_algorithm(*args, memo=transposition_table())[:2], trial
+    # A small table evicts but still gives the same values
+    small = transposition_table(max_size=20)
+    hands = random_hands(rng, 3)
+    others = hands[1] | hands[2] | hands[3]
+    args = ([hands[0], others, others, others], 0, suits[0], 2, 3)
+    assert dp_algorithm(*args, memo=small)[:2] == dp_algorithm(*args, memo=transposition_table())[:2]
+    assert small.evictions > 0 and len(small) == 20
+
+# ==== SEARCH EQUIVALENCES ====
+# The fast paths of the searches (Hall's check, the pruning, the alpha-beta of the endgame
+#  solver, see test_endgame) must give the same results as the plain versions they replace.
+
+# Hands of k cards for the 4 players, from a random deck
+def random_hands(rng, k):
+    cards = rng.sample(range(40), 4 * k)
+    return [make_hand(*cards[i * k:(i + 1) * k]) for i in range(4)]
+
+# Tells if the other players can have n cards each with the deck of beliefs, by trying every way
+#  to give the cards
+def brute_force_valid(deck, n):
+    pool = deck[1] | deck[2] | deck[3]
+    if popcount(deck[0]) != n or popcount(pool) != 3 * n:
+        return False
+    for first in combinations(hand_to_list(deck[1]), n):
+        rest = pool & ~make_hand(*first)
+        for second in combinations(hand_to_list(deck[2] & rest), n):
+            if rest & ~make_hand(*second) & ~deck[3] == 0:
+                return True
+    return False
+
+def test_hall_valid_is_brute_force():
+    rng = random.Random(3)
+    feasible = 0
+    for _ in range(3000):
+        n = rng.randint(1, 4)
+        cards = rng.sample(range(40), 4 * n + rng.randint(-1, 1))
+        pool = cards[n:]
+        deck = [make_hand(*cards[:n])] + [make_hand(*[c for c in pool if rng.random() < 0.6]) for _ in range(3)]
+        expected = brute_force_valid(deck, n)
+        feasible += expected
+        assert hall_valid(deck, n) == expected, deck
+    # Both answers are tested
+    assert 100 < feasible < 2900
+
+def test_pruned_search_is_exhaustive_search():
+    rng = random.Random(1)
+    configurations = [*aggregators.values(), min_utility]
+    for trial in range(60):
+        card_per_player = rng.choice([2, 3, 3])
+        hands = random_hands(rng, card_per_player)
+        others = hands[1] | hands[2] | hands[3]
+        # Some of the other players do not have hearts anymore
+        deck = [hands[0]] + [others & ~(suits[0] if rng.random() < 0.2 and not hands[i] & suits[0] else 0) for i in (1, 2, 3)]
+        start_player = rng.randrange(4)
+        atout = rng.choice([*suits, all_hand])
+        depth = rng.choice([1, 2]) if card_per_player == 2 else 1
+        heuristic = list(heuristics.values())[trial % len(heuristics)]
+        aggregate = configurations[trial % len(configurations)]
+        results = [dp_algorithm(deck, start_player, atout, depth, card_per_player, heuristic=heuristic, aggregate=aggregate, memo=transposition_table(), prune=prune)[:2] for prune in (False, True)]
+        assert results[0] == results[1], (trial, results)
+
+def test_symmetric_search_is_search():
+    rng = random.Random(4)
+    for trial in range(60):
+        card_per_player = rng.choice([2, 3])
+        hands = random_hands(rng, card_per_player)
+        others = hands[1] | hands[2] | hands[3]
+        deck = [hands[0], others, others, others]
+        start_player = rng.randrange(4)
+        atout = rng.choice([*suits, 0])
+        aggregate = list(aggregators.values())[trial % len(aggregators)]
+        values = [dp_algorithm(deck, start_player, atout, 1, card_per_player, heuristic=heuristics["future (0.4)"], aggregate=aggregate, memo=transposition_table(), symmetry=symmetry)[0] for symmetry in (False, True)]
+        assert math.isclose(values[0], values[1]), (trial, values)
@@ -0,0 +1,70 @@
+import io
+import random
+
+from pix.cards import attribute_cards, hand_to_list, one_hot, playable_cards, suit_of
+from pix.strategies import random_strategy
+from pix.engine import make_deal
+from pix.server import bot_answer, bot_session, serve
+
+# ==== BOT PROTOCOL ====
+
+def names(cards):
+    return " ".join(one_hot[c] for c in cards)
+
+# A session at seat with the hand of the seat in the deal of seed
+def new_session(seed, seat):
+    hands = attribute_cards(make_deal(seed))
+    session = bot_session(random_strategy(random.Random(seed)))
+    assert bot_answer(session, f"new {seat} {names(hand_to_list(hands[seat]))}") == "ok"
+    return session, hands
+
+def test_bot_plays_a_hand():
+    rng = random.Random(0)
+    for seed in range(5):
+        seat = seed % 4
+        session, hands = new_session(seed, seat)
+        assert bot_answer(session, "atout none" if seed % 2 else "atout S") == "ok"
+        assert bot_answer(session, "bid 0").split()[0] in ("bid", "pass")
+        leader = 0
+        for _ in range(10):
+            cards = []
+            for k in range(4):
+                p = (leader + k) % 4
+                legal = playable_cards(hands[p], suit_of[cards[0]]) if cards else hands[p]
+                if p == seat:
+                    answer = bot_answer(session, f"play {leader} {names(cards)}")
+                    assert answer.startswith("card "), answer
+                    c = one_hot.index(answer.split()[1])
+                    assert legal >> c & 1
+                else:
+                    c = rng.choice(hand_to_list(legal))
+                hands[p] &= ~(1 << c)
+                cards.append(c)
+            assert bot_answer(session, f"round {leader} {names(cards)}") == "ok"
+            leader = rng.randrange(4)
+        assert session.hand == 0
+
+def test_bot_errors():
+    session, hands = new_session(1, 0)
+    ours, theirs = hand_to_list(hands[0]), hand_to_list(hands[1])
+    for line in ["", "hello", "new 0 AH", "new 5 " + names(ours), "atout X", "play 0 ZZ",
+                 # It is the turn of the player 1
+                 f"play 1 {names(theirs[:1])}",
+                 # A card of the table is in our hand
+                 f"play 1 {names(ours[:3])}",
+                 # The round does not have our card, or has a card of our hand
+                 f"round 1 {names(hand_to_list(hands[1] | hands[2] | hands[3])[:4])}"]:
+        assert bot_answer(session, line).startswith("error"), line
+    card = one_hot.index(bot_answer(session, "play 0").split()[1])
+    assert bot_answer(session, "play 0").startswith("error")
+    assert bot_answer(session, f"round 0 {names([card, ours[0] if ours[0] != card else ours[1], *theirs[:2]])}").startswith("error")
+    # The bot still plays after the errors
+    others = [hand_to_list(hands[i])[0] for i in (1, 2, 3)]
+    assert bot_answer(session, f"round 0 {names([card, *others])}") == "ok"
+    assert bot_answer(session, "quit") is None
+
+def test_serve():
+    hands = attribute_cards(make_deal(2))
+    out = io.StringIO()
+    assert serve(io.StringIO(f"new 0 {names(hand_to_list(hands[0]))}\nhello\nquit\nnew\n"), out, random_strategy(random.Random(0)))
+    assert out.getvalue().splitlines() == ["ok", "error unknown message hello", "bye"]
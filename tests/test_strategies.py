@@ -0,0 +1,54 @@
+import math
+import random
+
+from pix.cards import all_hand, attribute_cards, hand_to_list, playable_cards, suit_of, suits
+from pix.engine import make_deal
+from pix.strategies import belief_state
+
+# ==== BELIEF STATE ====
+
+def test_belief_void_and_probabilities():
+    hand = attribute_cards(make_deal(0))[0]
+    belief = belief_state(hand)
+    others = all_hand & ~hand
+    assert all(belief.prob(0, c) == (c in hand_to_list(hand)) for c in range(40))
+    assert all(math.isclose(belief.prob(i, c), 1 / 3) for i in (1, 2, 3) for c in hand_to_list(others))
+
+    # The player 1 does not follow hearts: its hearts go to the players 2 and 3
+    heart = hand_to_list(others & suits[0])[0]
+    spade = hand_to_list(others & suits[3])[0]
+    belief.play(1, spade, suits[0])
+    assert belief.voids[1] == suits[0] and belief.hands[1] & suits[0] == 0
+    assert (belief.prob(1, heart), belief.prob(2, heart), belief.prob(3, heart)) == (0.0, 0.5, 0.5)
+    assert all(belief.prob(i, spade) == 0.0 for i in range(4))
+
+    # Then the player 2 does not follow hearts either: the player 3 has them all
+    diamond = hand_to_list(others & suits[1])[0]
+    belief.play(2, diamond, suits[0])
+    assert belief.prob(3, heart) == 1.0 and belief.prob(2, heart) == 0.0
+    # A player that follows the asked suit is not void
+    club = hand_to_list(others & suits[2])[0]
+    belief.play(3, club, suits[2])
+    assert belief.voids[3] == 0
+
+def test_belief_holds_the_real_hands():
+    rng = random.Random(2)
+    for seed in range(10):
+        hands = attribute_cards(make_deal(seed))
+        belief = belief_state(hands[0])
+        leader = 0
+        for _ in range(10):
+            asked = 0
+            for j in range(4):
+                p = (leader + j) % 4
+                c = rng.choice(hand_to_list(playable_cards(hands[p], asked) if asked else hands[p]))
+                asked = asked or suit_of[c]
+                hands[p] &= ~(1 << c)
+                belief.play(p, c, asked)
+            leader = rng.randrange(4)
+            # Every card of a player is possible for it, and each unknown card is somewhere
+            for i in range(4):
+                assert hands[i] & ~belief.hands[i] == 0
+            for c in hand_to_list(hands[1] | hands[2] | hands[3]):
+                assert math.isclose(sum(belief.prob(i, c) for i in (1, 2, 3)), 1)
+                assert all(belief.prob(i, c) > 0 for i in (1, 2, 3) if hands[i] >> c & 1)
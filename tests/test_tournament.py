@@ -0,0 +1,34 @@
+import pytest
+
+from pix.tournament import read_results, record_cell, run_tournament
+
+# ==== RESULTS FILE ====
+
+# Cells with a dp strategy that only searches the last card (the games are fast)
+cells = [("future (0.4)", "mean", 1, "random bot", dp_first) for dp_first in (True, False)]
+
+def test_resume_from_truncated_results(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    expected = run_tournament(cells, n_games=6, workers=1, verbose=False)
+    run_tournament(cells, n_games=6, workers=1, verbose=False, results=path)
+    with open(path) as f:
+        lines = f.readlines()
+    assert len(lines) == 12
+
+    # The run was interrupted while it wrote the sixth game
+    with open(path, "w") as f:
+        f.writelines(lines[:5])
+        f.write(lines[5][:len(lines[5]) // 2])
+    assert len(list(read_results(path))) == 5
+
+    # Only the missing games are played and the totals are the ones of the full run
+    assert run_tournament(cells, n_games=6, workers=1, verbose=False, results=path) == expected
+    games = [(record_cell(r), r["seed"]) for r in read_results(path)]
+    assert len(games) == 12 and len(set(games)) == 12
+
+def test_refuse_results_of_other_settings(tmp_path):
+    path = str(tmp_path / "results.jsonl")
+    run_tournament(cells, n_games=2, workers=1, verbose=False, results=path)
+    for settings in [{"base_seed": 1}, {"paired": True}]:
+        with pytest.raises(ValueError):
+            run_tournament(cells, n_games=2, workers=1, verbose=False, results=path, **settings)